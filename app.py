@@ -3,14 +3,25 @@
 # ======================================================================================
 
 import streamlit as st
-import sqlite3
-import hashlib
-from datetime import datetime
-import requests
-import pandas as pd
-import google.generativeai as genai
+from datetime import datetime, timezone
 import time
-import re
+import mentor_ai
+import llm_providers
+import metrics
+import plans
+import roadmap
+from prefetch import PrefetchEngine
+from write_behind import WriteBehindQueue
+from rate_limit import LOGIN_LIMITS, KeyedLimiter, RateLimitExceeded, all_limiters, forwarded_client, get_limiter
+from passwords import KDFBusy
+from db import (
+    bootstrap, add_user, check_user, add_ratings,
+    count_users, get_users_page, count_ratings, get_ratings_page, get_rating_summary, get_rating_daily,
+)
+# pandas, plotly and the JSearch client (requests) are imported by the pages that use them,
+# so a cold start on the login page never pays for them
+
+_rerun_started = time.perf_counter()
 
 # --- Page Configuration ---
 st.set_page_config(
@@ -20,182 +31,245 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# --- Function to load CSS ---
-def load_css(file_name):
+# --- Static assets, read from disk once per process instead of on every rerun ---
+@st.cache_resource
+def read_asset(path):
+    """Returns the file's bytes, or None if it does not exist."""
     try:
-        with open(file_name) as f:
-            st.markdown(f'<style>{f.read()}</style>', unsafe_allow_html=True)
+        with open(path, "rb") as f:
+            return f.read()
     except FileNotFoundError:
+        return None
+
+def load_css(file_name):
+    css = read_asset(file_name)
+    if css is None:
         st.error(f"CSS file not found. Please make sure `style.css` is in the same directory as `app.py`.")
+        return
+    st.markdown(f'<style>{css.decode()}</style>', unsafe_allow_html=True)
 
 load_css("style.css")
 
 
 # ======================================================================================
-# DATABASE LOGIC
+# AI & TOOLS LOGIC
 # ======================================================================================
-DB_NAME = "users_v5.db" # Using a new DB file for the new structure
+
+# Generations live in mentor_ai.py and are cached in llm_cache.db, shared by all workers
+STREAM_RESPONSES = True  # Render guidance and roadmaps chunk by chunk as Gemini produces them
 
 @st.cache_resource
-def get_db_connection():
-    conn = sqlite3.connect(DB_NAME, check_same_thread=False)
-    return conn
-
-# --- UPDATED: init_db now creates a ratings table ---
-def init_db():
-    conn = get_db_connection()
-    c = conn.cursor()
-    c.execute('CREATE TABLE IF NOT EXISTS users (id INTEGER PRIMARY KEY, fullname TEXT NOT NULL, email TEXT UNIQUE NOT NULL, password_hash TEXT NOT NULL, role TEXT NOT NULL DEFAULT "user")')
-    c.execute("SELECT * FROM users WHERE email = ?", ('admin@example.com',))
-    if c.fetchone() is None:
-        admin_pass_hash = hashlib.sha256('admin123'.encode()).hexdigest()
-        c.execute("INSERT INTO users (fullname, email, password_hash, role) VALUES (?, ?, ?, ?)", ('Admin User', 'admin@example.com', admin_pass_hash, 'admin'))
-    
-    # NEW: Create the ratings table
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS ratings (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_email TEXT NOT NULL,
-            rating INTEGER NOT NULL,
-            submitted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_email) REFERENCES users (email)
-        )
-    ''')
-    conn.commit()
-
-def add_user(fullname, email, password):
-    conn = get_db_connection()
-    try:
-        c = conn.cursor()
-        password_hash = hashlib.sha256(password.encode()).hexdigest()
-        c.execute("INSERT INTO users (fullname, email, password_hash) VALUES (?, ?, ?)", (fullname, email, password_hash))
-        conn.commit()
-        return True
-    except sqlite3.IntegrityError: return False
-
-def check_user(email, password):
-    conn = get_db_connection()
-    c = conn.cursor()
-    password_hash = hashlib.sha256(password.encode()).hexdigest()
-    c.execute("SELECT fullname, role FROM users WHERE email = ? AND password_hash = ?", (email, password_hash))
-    return c.fetchone()
-
-def get_all_users():
-    conn = get_db_connection()
-    c = conn.cursor()
-    c.execute("SELECT id, fullname, email, role FROM users")
-    return c.fetchall()
-
-# --- NEW: Functions to handle ratings ---
-def add_rating(user_email, rating_value):
-    """Saves a user's rating to the database."""
-    conn = get_db_connection()
-    c = conn.cursor()
-    rating_int = len(rating_value) # Convert '⭐⭐⭐' to 3
-    c.execute("INSERT INTO ratings (user_email, rating) VALUES (?, ?)", (user_email, rating_int))
-    conn.commit()
-
-def get_all_ratings():
-    """Fetches all ratings for the admin dashboard."""
-    conn = get_db_connection()
-    c = conn.cursor()
-    # Join with users table to get the user's full name, which is more user-friendly
-    c.execute("""
-        SELECT r.id, u.fullname, r.user_email, r.rating, r.submitted_at
-        FROM ratings r
-        JOIN users u ON r.user_email = u.email
-        ORDER BY r.submitted_at DESC
-    """)
-    return c.fetchall()
+def get_llm_provider():
+    """Creates the model client once per process (MENTOR_LLM_PROVIDER=fake runs offline)."""
+    return llm_providers.set_provider(llm_providers.create_provider(api_key=lambda: st.secrets["GEMINI_API_KEY"]))
 
+get_llm_provider()
 
-# ======================================================================================
-# AI & TOOLS LOGIC
-# ======================================================================================
+def _report_stream_errors(chunks, error_message):
+    """Passes chunks through, turning a mid-stream failure into an st.error like the blocking path."""
+    try:
+        yield from chunks
+    except RateLimitExceeded as e:
+        st.warning(str(e))
+    except Exception as e:
+        st.error(f"{error_message} Details: {e}")
 
-@st.cache_data(ttl=3600)
-def get_fields_from_gemini(interest_text):
+def get_plan_for_interests(interest_text):
+    """Reuses the saved plan for (nearly) the same interests, else suggests fields and saves a new plan.
+
+    Returns (plan, reused); plan is None when no fields could be suggested.
+    """
     try:
-        genai.configure(api_key=st.secrets["GEMINI_API_KEY"])
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        prompt = f"""Based on the user's interest in '{interest_text}', suggest 4 specific and diverse career fields. Return the answer ONLY as a Python list of strings."""
-        response = model.generate_content(prompt)
-        match = re.search(r'\[.*?\]', response.text.replace('`', ''))
-        if match: return eval(match.group())
-        else: return ["Could not determine fields, please try a different interest."]
+        return plans.suggest_fields(st.session_state.email, interest_text)
+    except RateLimitExceeded as e:
+        st.warning(str(e))
     except Exception as e:
         st.error(f"Error communicating with Gemini: {e}")
-        return []
+    return None, False
+
+def current_plan():
+    plan_id = st.session_state.get('plan_id')
+    return plans.get_plan(plan_id) if plan_id else None
+
+def restore_saved_plan(email):
+    """Puts a returning user's latest plan back into the session, so nothing is regenerated."""
+    plan = plans.latest_plan(email)
+    if plan is None:
+        return
+    st.session_state.plan_id = plan.id
+    st.session_state.interests = plan.interests
+    st.session_state.suggested_fields = plan.fields
+    if plan.chosen_field:
+        st.session_state.chosen_field = plan.chosen_field
+        st.session_state.stage = 'show_plan'
+    else:
+        st.session_state.stage = 'select_field'
 
-@st.cache_data(ttl=3600)
-def get_gemini_guidance(interests, field):
+def get_gemini_guidance(interests, field, stream=False):
+    error_message = "An error occurred while communicating with the Gemini API."
+    if stream:
+        return _report_stream_errors(mentor_ai.stream_guidance(interests, field), error_message)
     try:
-        genai.configure(api_key=st.secrets["GEMINI_API_KEY"])
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        prompt = f"""You are 'Mentor', an expert career AI. Generate an inspiring and detailed career guide for a student interested in '{field}', with interests in '{interests}'. Use markdown and emojis. Include these sections: 🚀 Why Your Interests Are a Perfect Match, 🗺️ Your 6-Month Kickstart Roadmap, 🌟 A Word of Encouragement."""
-        response = model.generate_content(prompt)
-        return response.text
+        return mentor_ai.generate_guidance(interests, field)
+    except RateLimitExceeded as e:
+        st.warning(str(e))
+        return None
     except Exception as e:
-        st.error(f"An error occurred while communicating with the Gemini API. Details: {e}")
+        st.error(f"{error_message} Details: {e}")
         return None
 
-@st.cache_data(ttl=3600)
-def get_gemini_roadmap_interactive(field):
+def get_gemini_roadmap_interactive(field, stream=False):
+    error_message = "An error occurred while generating the roadmap."
+    if stream:
+        return _report_stream_errors(mentor_ai.stream_roadmap(field), error_message)
     try:
-        genai.configure(api_key=st.secrets["GEMINI_API_KEY"])
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        prompt = f"""
-        Create a detailed, step-by-step career roadmap for a '{field}'. The tone must be encouraging, professional, and clear for a student. Format the output using markdown. Use emojis for each phase title.
-        **CRITICAL:** Structure the response into exactly 4 phases, each with a title like this: '### 🎓 Phase 1: Title'.
-        Inside each phase, include these EXACT subheadings with bolding:
-        - **Timeline:** (e.g., 6-12 Months)
-        - **Key Skills to Acquire:** (A short bulleted list of essential technical and soft skills)
-        - **Recommended Projects:** (A numbered list of 1-2 project ideas to build a portfolio)
-        - **Networking & Growth:** (A short bulleted list of tips, like joining communities or finding a mentor)
-        """
-        response = model.generate_content(prompt)
-        return response.text
+        return mentor_ai.generate_roadmap(field)
+    except RateLimitExceeded as e:
+        st.warning(str(e))
+        return None
     except Exception as e:
-        st.error(f"An error occurred while generating the roadmap. Details: {e}")
+        st.error(f"{error_message} Details: {e}")
         return None
 
-def parse_and_display_roadmap(roadmap_content):
-    phases = re.split(r'### (.*?)\n', roadmap_content)
-    if len(phases) > 1:
-        for i in range(1, len(phases), 2):
-            phase_title = phases[i]
-            phase_details = phases[i+1]
-            with st.expander(phase_title):
-                st.markdown(phase_details, unsafe_allow_html=True)
+MENTOR_FLOW_PAGES = ('mentor', 'roadmap')
+
+@st.cache_resource
+def get_prefetch_engine():
+    """One bounded pool per process, shared by every session."""
+    return PrefetchEngine()
+
+def cancel_prefetch():
+    user_email = st.session_state.get('email')
+    if user_email:
+        get_prefetch_engine().cancel(user_email)
+
+def display_roadmap(structure):
+    """Renders a parsed Roadmap: one expander per phase plus every skill at a glance."""
+    for phase in structure.phases:
+        with st.expander(phase.title):
+            st.markdown(phase.body, unsafe_allow_html=True)
+    display_roadmap_skills(structure)
+
+def display_roadmap_skills(structure):
+    skills = structure.all_skills()
+    if skills:
+        with st.expander("🧰 All Skills Across Phases"):
+            st.markdown(" · ".join(skills))
+
+def parse_and_display_roadmap(roadmap_content, stream=False):
+    """Renders each phase in an expander. With stream=True, roadmap_content is an iterator of
+    chunks: each expander opens as soon as its heading arrives and fills in as text streams.
+    Returns the full roadmap text."""
+    if not stream:
+        structure = roadmap.parse_roadmap(roadmap_content)
+        if structure.phases:
+            display_roadmap(structure)
+        else:  # No recognizable phase headings: show the roadmap as written
+            st.markdown(roadmap_content, unsafe_allow_html=True)
+        return roadmap_content
+    slots, text = [], ""
+    for phases, text in roadmap.iter_phases(roadmap_content):
+        for i, (phase_title, phase_details) in enumerate(phases):
+            if i >= len(slots):
+                if slots:  # The previous phase is complete; collapse it like the non-streaming view
+                    prev_title, prev_details = phases[i - 1]
+                    with slots[-1].container():
+                        with st.expander(prev_title):
+                            st.markdown(prev_details, unsafe_allow_html=True)
+                slots.append(st.empty())
+        if slots:
+            phase_title, phase_details = phases[-1]
+            with slots[-1].container():
+                with st.expander(phase_title, expanded=True):
+                    st.markdown(phase_details, unsafe_allow_html=True)
+    if text and not slots:
+        st.markdown(text, unsafe_allow_html=True)
+    return text
 
-def get_real_world_jobs(query):
+@st.cache_resource
+def get_jobs_client():
+    """One pooled keep-alive JSearch session per process, shared by every session and its rate budget."""
+    from jobs_client import JSearchClient
+    return JSearchClient(st.secrets["JSEARCH_API_KEY"], limiter=get_limiter("jsearch"))
+
+@st.cache_resource
+def get_job_index():
+    """The local, deduplicated store of every posting fetched (job_index.db), shared by all sessions."""
+    from job_index import JobIndex
+    return JobIndex()
+
+def get_real_world_jobs(pager):
+    """Fetches the next page of a search from JSearch into the job index. Returns False on failure."""
+    import requests
     try:
-        api_key = st.secrets["JSEARCH_API_KEY"]
-        url = "https://jsearch.p.rapidapi.com/search"
-        querystring = {"query": query, "page": "1", "num_pages": "1"}
-        headers = {"X-RapidAPI-Key": api_key, "X-RapidAPI-Host": "jsearch.p.rapidapi.com"}
-        response = requests.get(url, headers=headers, params=querystring, timeout=20)
-        response.raise_for_status()
-        results = response.json()
-        if "data" in results and results["data"]:
-            job_listings = [{"Title": job.get("job_title"), "Company": job.get("employer_name"), "Location": f"{job.get('job_city', '')}, {job.get('job_state', '')}".strip(", "), "Link": job.get("job_apply_link")} for job in results["data"][:20]]
-            return pd.DataFrame(job_listings)
-        return pd.DataFrame()
+        with metrics.timed("app.get_real_world_jobs"):
+            pager.load_more()
+        return True
+    except RateLimitExceeded as e:
+        st.warning(str(e))
     except requests.exceptions.Timeout:
         st.error("The job search request timed out. The server might be busy. Please try again in a moment.")
-        return None
     except Exception as e:
         st.error(f"An error occurred while fetching jobs: {e}")
-        return None
+    return False
+
+def jobs_frame(rows):
+    import pandas as pd
+    from jobs_client import JOB_COLUMNS
+    with metrics.timed("app.dataframe"):
+        return pd.DataFrame.from_records(rows, columns=JOB_COLUMNS)
 
 # ======================================================================================
 # MAIN APPLICATION LOGIC & UI
 # ======================================================================================
 
-init_db()
+bootstrap()  # Schema migrations run once per process, not on every rerun
+
+@st.cache_resource
+def start_metrics_exporters():
+    """Starts the /metrics endpoint or file writer once per process, if configured."""
+    return metrics.start_exporters()
+
+start_metrics_exporters()
+
+@st.cache_resource
+def get_rating_writer():
+    """Batches rating inserts on one background worker per process; drained on shutdown."""
+    return WriteBehindQueue(add_ratings, name="rating-writer")
 
 if "page" not in st.session_state: st.session_state.page = "login"
 
+@st.cache_resource
+def get_login_limiters():
+    """Per-email and per-IP login attempt budgets, shared by every session in this process."""
+    return {kind: KeyedLimiter(f"login {kind}", **limits) for kind, limits in LOGIN_LIMITS.items()}
+
+def client_ip():
+    """The peer address, or for a local reverse proxy (whose peer is localhost, reported as None)
+    the address it appended to X-Forwarded-For; see rate_limit.TRUSTED_PROXIES."""
+    return (getattr(st.context, "ip_address", None)
+            or forwarded_client(st.context.headers.get("X-Forwarded-For"))
+            or "unknown")
+
+def attempt_login(email, password):
+    """Throttles the attempt, then verifies it. Returns (fullname, role) or None."""
+    limiters = get_login_limiters()
+    try:
+        limiters["ip"].hit(client_ip())
+        limiters["email"].hit(email.strip().lower())
+        user_data = check_user(email, password)
+    except RateLimitExceeded as e:
+        st.warning(f"Too many login attempts. Please wait about {e.wait:.0f}s and try again.")
+        return None
+    except KDFBusy as e:
+        st.warning(str(e))
+        return None
+    if user_data:
+        limiters["email"].reset(email.strip().lower())
+    else:
+        st.error("Invalid email or password")
+    return user_data
+
 def login_page():
     st.title("Welcome to the Career Mentor By Taha ✨")
     st.markdown('<h3 class="subtitle">Your personal guide to a successful future.</h3>', unsafe_allow_html=True)
@@ -206,17 +280,16 @@ def login_page():
         st.text_input("Email", key="login_email")
         st.text_input("Password", type="password", key="login_pass")
         if st.button("Login"):
-            user_data = check_user(st.session_state.login_email, st.session_state.login_pass)
+            user_data = attempt_login(st.session_state.login_email, st.session_state.login_pass)
             if user_data:
                 st.session_state.logged_in = True
                 st.session_state.fullname = user_data[0]
                 st.session_state.role = user_data[1]
                 # --- NEW: Store email in session state for rating ---
                 st.session_state.email = st.session_state.login_email
+                restore_saved_plan(st.session_state.email)
                 st.session_state.page = "home"
                 st.rerun()
-            else:
-                st.error("Invalid email or password")
         st.markdown('</div>', unsafe_allow_html=True)
 
 def signup_page():
@@ -230,12 +303,20 @@ def signup_page():
         st.text_input("Email", key="signup_email")
         st.text_input("Choose a Password", type="password", key="signup_pass")
         if st.button("Sign Up"):
-            if add_user(st.session_state.signup_fullname, st.session_state.signup_email, st.session_state.signup_pass):
-                st.success("Account created! Please proceed to login.")
-                st.session_state.page = "login"
-                st.rerun()
+            try:
+                get_login_limiters()["ip"].hit(client_ip())
+                created = add_user(st.session_state.signup_fullname, st.session_state.signup_email, st.session_state.signup_pass)
+            except RateLimitExceeded as e:
+                st.warning(f"Too many attempts. Please wait about {e.wait:.0f}s and try again.")
+            except KDFBusy as e:
+                st.warning(str(e))
             else:
-                st.error("This email is already registered.")
+                if created:
+                    st.success("Account created! Please proceed to login.")
+                    st.session_state.page = "login"
+                    st.rerun()
+                else:
+                    st.error("This email is already registered.")
         st.markdown('</div>', unsafe_allow_html=True)
 
 def home_page():
@@ -251,10 +332,10 @@ def home_page():
         """)
         st.info("**Your First Step:** Click on one of the tools below to begin your exploration!")
     with col2:
-        image_path = "assets/main.jpg"
-        try:
-            st.image(image_path, width=600)
-        except Exception:
+        image = read_asset("assets/main.jpg")
+        if image is not None:
+            st.image(image, width=600)
+        else:
             st.warning("`assets/main.jpg` not found. Please add it to your assets folder.")
     st.markdown('</div>', unsafe_allow_html=True)
 
@@ -317,13 +398,26 @@ def mentor_page():
         if st.button("Find My Career Paths"):
             if st.session_state.interest_text:
                 with st.spinner("AI is analyzing your interests..."):
-                    st.session_state.suggested_fields = get_fields_from_gemini(st.session_state.interest_text)
+                    plan, reused = get_plan_for_interests(st.session_state.interest_text)
+                if plan is not None:
+                    # A plan reused from the user's own history keeps its interests text and saved guidance
+                    st.session_state.plan_id = plan.id
+                    st.session_state.interests = plan.interests
+                    st.session_state.suggested_fields = plan.fields
+                    st.session_state.plan_reused = reused
+                else:
                     st.session_state.interests = st.session_state.interest_text
+                    st.session_state.suggested_fields = []
+                if st.session_state.suggested_fields:
+                    # Warm guidance and roadmaps for every suggestion while the user is choosing
+                    get_prefetch_engine().prefetch_plans(st.session_state.email, st.session_state.interests, st.session_state.suggested_fields)
                 st.session_state.stage = 'select_field'
                 st.rerun()
             else: st.warning("Please tell me about your interests first!")
     if st.session_state.stage == 'select_field':
         st.header("💡 Here are some career paths that match your interests:")
+        if st.session_state.get('plan_reused'):
+            st.caption("♻️ These come from a saved plan for very similar interests.")
         if st.session_state.suggested_fields:
             chosen_field = st.radio("Which path would you like to explore in detail?", st.session_state.suggested_fields, key="field_choice")
             if st.button("Generate My Personal Plan"):
@@ -337,13 +431,31 @@ def mentor_page():
                 st.rerun()
     st.markdown('</div>', unsafe_allow_html=True)
     if st.session_state.stage == 'show_plan':
-        guidance_content = get_gemini_guidance(st.session_state.interests, st.session_state.chosen_field)
-        if guidance_content:
+        interests, chosen_field = st.session_state.interests, st.session_state.chosen_field
+        plan = current_plan()
+        saved_guidance = plan.guidance_for(chosen_field) if plan else None
+        if saved_guidance:
             st.markdown('<div class="card">', unsafe_allow_html=True)
-            st.markdown(guidance_content)
+            st.markdown(saved_guidance)
             st.markdown('</div>', unsafe_allow_html=True)
+        elif STREAM_RESPONSES:
+            st.markdown('<div class="card">', unsafe_allow_html=True)
+            st.write_stream(get_gemini_guidance(interests, chosen_field, stream=True))
+            st.markdown('</div>', unsafe_allow_html=True)
+            if plan:
+                # Only a stream that completed reached the response cache
+                plans.save_guidance(plan.id, chosen_field, mentor_ai.cached_guidance(interests, chosen_field))
+        else:
+            guidance_content = get_gemini_guidance(interests, chosen_field)
+            if guidance_content:
+                st.markdown('<div class="card">', unsafe_allow_html=True)
+                st.markdown(guidance_content)
+                st.markdown('</div>', unsafe_allow_html=True)
+                if plan:
+                    plans.save_guidance(plan.id, chosen_field, guidance_content)
         if st.button("⬅️ Explore Another Interest"):
-            keys_to_clear = ['stage', 'chosen_field', 'suggested_fields', 'interests']
+            cancel_prefetch()
+            keys_to_clear = ['stage', 'chosen_field', 'suggested_fields', 'interests', 'plan_id', 'plan_reused']
             for key in keys_to_clear:
                 if key in st.session_state: del st.session_state[key]
             st.rerun()
@@ -353,11 +465,32 @@ def roadmap_page():
     st.markdown("A dynamic, AI-generated journey for your chosen career.")
     st.markdown('<div class="card">', unsafe_allow_html=True)
     if 'chosen_field' in st.session_state:
-        st.info(f"Generating a custom roadmap for: **{st.session_state.chosen_field}**")
-        roadmap_content = get_gemini_roadmap_interactive(st.session_state.chosen_field)
-        if roadmap_content:
-            parse_and_display_roadmap(roadmap_content)
+        chosen_field = st.session_state.chosen_field
+        st.info(f"Generating a custom roadmap for: **{chosen_field}**")
+        # Reruns render straight from the saved plan or the cached structure; only a first visit parses text
+        plan = current_plan()
+        structure = plan.roadmap_for(chosen_field) if plan else None
+        saved = structure is not None
+        if structure is None:
+            structure = mentor_ai.cached_roadmap_structure(chosen_field)
+        roadmap_content = structure is not None
+        if structure is not None:
+            display_roadmap(structure)
+        elif STREAM_RESPONSES:
+            roadmap_content = parse_and_display_roadmap(get_gemini_roadmap_interactive(chosen_field, stream=True), stream=True)
+            # Only a stream that completed reached the response cache; a cut-off one is never remembered
+            completed = mentor_ai.cached_roadmap(chosen_field)
+            if roadmap_content and completed:
+                structure = mentor_ai.remember_roadmap_structure(chosen_field, completed)
+                display_roadmap_skills(structure)
         else:
+            roadmap_content = get_gemini_roadmap_interactive(chosen_field)
+            if roadmap_content:
+                parse_and_display_roadmap(roadmap_content)
+                structure = mentor_ai.remember_roadmap_structure(chosen_field, roadmap_content)
+        if plan and not saved:
+            plans.save_roadmap(plan.id, chosen_field, structure)
+        if not roadmap_content:
             st.warning("Could not generate a roadmap at this time. Please try again.")
     else:
         st.warning("Please select a career in the '🤖 Career Mentor' page first to generate a personalized roadmap.")
@@ -377,45 +510,154 @@ def jobs_page():
         if not search_career:
             st.warning("Please enter a career or job title to search.")
         else:
+            from jobs_client import PAGE_SIZE
             full_query = f"{search_career} in {search_location}"
-            with st.spinner(f"Searching for '{full_query}'..."):
-                st.session_state.jobs_df = get_real_world_jobs(full_query)
-    if 'jobs_df' in st.session_state:
-        jobs_df = st.session_state.jobs_df
-        if jobs_df is not None and not jobs_df.empty:
-            st.success(f"Found {len(jobs_df)} job postings!")
+            index = get_job_index()
+            pager = get_jobs_client().pager(search_career, search_location, index=index)
+            st.session_state.jobs_search = (search_career, search_location)
+            st.session_state.jobs_pager = pager
+            for key in ('jobs_companies', 'jobs_locations', 'jobs_filter'):
+                st.session_state.pop(key, None)
+            # Answered from the local index when it already holds enough recent matches; the API is the fallback
+            st.session_state.jobs_failed = False
+            if pager.pages_loaded == 0 and index.count(search_career, search_location, max_age=index.query_ttl) < PAGE_SIZE:
+                with st.spinner(f"Searching for '{full_query}'..."):
+                    st.session_state.jobs_failed = not get_real_world_jobs(pager)
+    if 'jobs_search' in st.session_state:
+        career, location = st.session_state.jobs_search
+        index = get_job_index()
+        facets = index.facets(career, location)
+        if facets["company"] or facets["location"]:
+            company_counts, location_counts = dict(facets["company"]), dict(facets["location"])
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                companies = st.multiselect("Company", list(company_counts), format_func=lambda v: f"{v} ({company_counts[v]})", key="jobs_companies")
+            with col2:
+                locations = st.multiselect("Location", list(location_counts), format_func=lambda v: f"{v} ({location_counts[v]})", key="jobs_locations")
+            with col3:
+                text = st.text_input("Filter within results", key="jobs_filter")
+            jobs_df = jobs_frame(index.search(career, location, companies, locations, text))
+            filtered = companies or locations or text.strip()
+            st.success(f"Showing {len(jobs_df)} matching job postings." if filtered else f"Found {len(jobs_df)} job postings!")
             st.dataframe(jobs_df, use_container_width=True, hide_index=True, column_config={"Link": st.column_config.LinkColumn("Apply", display_text="🔗 Apply")})
-        elif jobs_df is not None:
+            pager = st.session_state.get('jobs_pager')
+            if pager is not None and not pager.exhausted:
+                if st.button("Load More Jobs", key="jobs_load_more"):
+                    with st.spinner("Loading more postings..."):
+                        get_real_world_jobs(pager)
+                    st.rerun()
+        elif not st.session_state.get('jobs_failed'):
             st.warning("Could not find any current job listings for this search. Try a broader location or career title.")
     st.markdown('</div>', unsafe_allow_html=True)
 
-# --- UPDATED: Admin dashboard now shows ratings ---
+ADMIN_PAGE_SIZES = [25, 50, 100]
+
+def _page_controls(key, total):
+    """Page-size and page-number pickers for a server-side paginated table; returns (limit, offset)."""
+    col1, col2, col3 = st.columns([1, 1, 2])
+    with col1:
+        page_size = st.selectbox("Rows per page", ADMIN_PAGE_SIZES, key=f"{key}_page_size")
+    page_count = max(1, -(-total // page_size))
+    with col2:
+        page = st.number_input("Page", min_value=1, max_value=page_count, value=1, step=1, key=f"{key}_page")
+    with col3:
+        st.caption(f"{total} rows · page {page} of {page_count}")
+    return page_size, (page - 1) * page_size
+
+def _ratings_chart(daily_rows):
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
+    days = [row[0] for row in daily_rows]
+    fig = make_subplots(specs=[[{"secondary_y": True}]])
+    fig.add_trace(go.Bar(x=days, y=[row[1] for row in daily_rows], name="Ratings"), secondary_y=False)
+    fig.add_trace(go.Scatter(x=days, y=[row[2] for row in daily_rows], name="Average", mode="lines+markers"), secondary_y=True)
+    fig.update_yaxes(title_text="Ratings", secondary_y=False)
+    fig.update_yaxes(title_text="Average ⭐", range=[0, 5.2], secondary_y=True)
+    fig.update_layout(title="Ratings Over Time", height=360, margin=dict(l=10, r=10, t=50, b=10), legend=dict(orientation="h"))
+    return fig
+
+def _performance_section():
+    """Live latency percentiles, error rates and cache hit ratios for this server process."""
+    import pandas as pd
+    timings, caches = metrics.snapshot()
+    if not timings:
+        st.info("No operations have been measured yet.")
+        return
+    exporters = start_metrics_exporters()
+    st.caption("Since this process started. Percentiles cover the last "
+               f"{metrics.WINDOW} calls of each operation."
+               + (f" Prometheus: {', '.join(exporters)}" if exporters else ""))
+    st.dataframe(pd.DataFrame([{
+        "Operation": row["name"], "Calls": row["count"], "Errors": row["errors"],
+        "Error rate": f"{row['error_rate']:.1%}", "p50 ms": round(row["p50"] * 1000, 1),
+        "p95 ms": round(row["p95"] * 1000, 1), "p99 ms": round(row["p99"] * 1000, 1),
+        "Mean ms": round(row["mean"] * 1000, 1),
+    } for row in timings]), use_container_width=True, hide_index=True)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.subheader("Cache Hit Ratios")
+        st.dataframe(pd.DataFrame([{
+            "Cache": row["name"], "Hits": row["hits"], "Misses": row["misses"], "Hit ratio": f"{row['hit_ratio']:.1%}",
+        } for row in caches], columns=["Cache", "Hits", "Misses", "Hit ratio"]), use_container_width=True, hide_index=True)
+    with col2:
+        st.subheader("Upstream Budgets")
+        st.dataframe(pd.DataFrame([{
+            "Upstream": name, "Rate /s": round(limiter.rate, 2), "Rejected": limiter.rejected, "429s": limiter.throttled,
+        } for name, limiter in all_limiters().items()], columns=["Upstream", "Rate /s", "Rejected", "429s"]), use_container_width=True, hide_index=True)
+    st.download_button("Download Prometheus metrics", metrics.render_prometheus(), file_name="metrics.prom", mime="text/plain")
+
+# --- UPDATED: Admin dashboard pages and filters in SQL and reads metrics from the daily rollup ---
 def admin_dashboard_page():
+    import pandas as pd
     st.title("🔑 Admin Dashboard")
     st.markdown("View all registered users and submitted ratings.")
 
     st.markdown('<div class="card">', unsafe_allow_html=True)
     st.header("Registered Users")
-    users_data = get_all_users()
-    if users_data:
-        df_users = pd.DataFrame(users_data, columns=['ID', 'Full Name', 'Email', 'Role'])
+    user_search = st.text_input("Search by name or email", key="admin_user_search")
+    total_users = count_users(user_search)
+    if total_users:
+        limit, offset = _page_controls("admin_users", total_users)
+        df_users = pd.DataFrame(get_users_page(limit, offset, user_search), columns=['ID', 'Full Name', 'Email', 'Role'])
         st.dataframe(df_users, use_container_width=True, hide_index=True)
+    elif user_search:
+        st.info("No users match this search.")
     else:
         st.info("No users have registered yet.")
     st.markdown('</div>', unsafe_allow_html=True)
 
     st.markdown('<div class="card">', unsafe_allow_html=True)
     st.header("User Ratings & Feedback")
-    ratings_data = get_all_ratings()
-    if ratings_data:
-        df_ratings = pd.DataFrame(ratings_data, columns=['ID', 'Full Name', 'Email', 'Rating (out of 5)', 'Submitted At'])
-        avg_rating = df_ratings['Rating (out of 5)'].mean()
-        st.metric(label="Average App Rating", value=f"{avg_rating:.2f} ⭐")
-        st.dataframe(df_ratings, use_container_width=True, hide_index=True)
+    summary = get_rating_summary()
+    if summary["count"]:
+        col1, col2 = st.columns(2)
+        col1.metric(label="Average App Rating", value=f"{summary['average']:.2f} ⭐")
+        col2.metric(label="Total Ratings", value=summary["count"])
+        st.plotly_chart(_ratings_chart(get_rating_daily()), use_container_width=True)
+
+        col1, col2 = st.columns(2)
+        with col1:
+            stars = st.multiselect("Filter by rating", [1, 2, 3, 4, 5], key="admin_rating_stars")
+        with col2:
+            email = st.text_input("Filter by user email", key="admin_rating_email").strip()
+        total_ratings = count_ratings(stars, email)
+        if total_ratings:
+            limit, offset = _page_controls("admin_ratings", total_ratings)
+            df_ratings = pd.DataFrame(get_ratings_page(limit, offset, stars, email), columns=['ID', 'Full Name', 'Email', 'Rating (out of 5)', 'Submitted At'])
+            st.dataframe(df_ratings, use_container_width=True, hide_index=True)
+        else:
+            st.info("No ratings match these filters.")
     else:
         st.info("No ratings have been submitted yet.")
     st.markdown('</div>', unsafe_allow_html=True)
 
+    st.markdown('<div class="card">', unsafe_allow_html=True)
+    st.header("⚡ Performance")
+    _performance_section()
+    st.markdown('</div>', unsafe_allow_html=True)
+
 
 # --- Main Application Router ---
 if not st.session_state.get('logged_in'):
@@ -440,6 +682,8 @@ else:
     
     if page_options[page_selection] != st.session_state.page:
         st.session_state.page = page_options[page_selection]
+        if st.session_state.page not in MENTOR_FLOW_PAGES:
+            cancel_prefetch()
         st.rerun()
 
     # --- UPDATED: Sidebar now saves ratings correctly ---
@@ -452,15 +696,19 @@ else:
         if st.button("Submit Rating", key="rating_button", use_container_width=True):
             user_email = st.session_state.get('email')
             if user_email:
-                add_rating(user_email, rating)
-                st.sidebar.success("Thank you for your rating!")
-                time.sleep(2)
-                st.rerun() # To clear the success message after a delay
+                # Queued for the background writer; the toast fades on its own, so no sleep/rerun
+                submitted_at = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+                try:
+                    get_rating_writer().submit((user_email, len(rating), submitted_at))
+                    st.toast("Thank you for your rating!", icon="⭐")
+                except Exception:
+                    st.sidebar.error("Error submitting rating.")
             else:
                 st.sidebar.error("Error submitting rating.")
 
         st.divider()
         def logout():
+            cancel_prefetch()
             # Clear all session state keys to log out
             for key in list(st.session_state.keys()):
                 del st.session_state[key]
@@ -473,4 +721,5 @@ else:
     page_map[st.session_state.page]()
 
 # --- Fixed Main Footer ---
-st.markdown('<div class="main-footer">Career Mentor by Taha</div>', unsafe_allow_html=True)
\ No newline at end of file
+st.markdown('<div class="main-footer">Career Mentor by Taha</div>', unsafe_allow_html=True)
+metrics.observe("app.rerun", time.perf_counter() - _rerun_started)  # Runs cut short by st.rerun() are not recorded
\ No newline at end of file
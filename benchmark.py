@@ -0,0 +1,834 @@
+# ======================================================================================
+# BENCHMARKS - headless load tests for the app's hot paths
+# ======================================================================================
+# Usage:
+#   python benchmark.py db --threads 16 --ops 200
+#   python benchmark.py ratings --threads 8 --ops 200
+#   python benchmark.py flows --users 20 --sessions 10 --latency 0.3 --stream
+#   python benchmark.py jobs --retry-after 3600
+#   python benchmark.py parse
+#   python benchmark.py stream --chunk-size 32 --chunk-delay 0.01
+#   python benchmark.py login --threads 8 --logins 20 --costs 10 12 14
+#   python benchmark.py startup --cold 5 --reruns 30
+#
+# Every benchmark runs against scratch files in a temporary directory, never against
+# users_v5.db or llm_cache.db.
+
+import argparse
+import json
+import logging
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+def report(title, latencies, elapsed, extra=None):
+    """Prints p50/p95/p99 latency (ms) and throughput for one benchmark."""
+    ms = [s * 1000 for s in latencies]
+    extra = extra or {}
+    width = max([10] + [len(label) for label in extra])
+    print(f"\n== {title} ==")
+    if ms:
+        print(f"  {'operations':<{width}} : {len(ms)} in {elapsed:.2f}s ({len(ms) / elapsed if elapsed else 0:.1f} ops/s)")
+        print(f"  {'latency ms':<{width}} : p50={percentile(ms, 50):.2f} p95={percentile(ms, 95):.2f} "
+              f"p99={percentile(ms, 99):.2f} mean={statistics.fmean(ms):.2f} max={max(ms):.2f}")
+    for label, value in extra.items():
+        print(f"  {label:<{width}} : {value}")
+
+def run_threads(threads, worker):
+    """Runs worker(thread_index) on N threads; returns (all latencies, elapsed seconds)."""
+    latencies, lock = [], threading.Lock()
+    errors = []
+    def target(index):
+        try:
+            local = worker(index)
+        except Exception as e:
+            errors.append(e)
+            return
+        with lock:
+            latencies.extend(local)
+    pool = [threading.Thread(target=target, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for t in pool: t.start()
+    for t in pool: t.join()
+    elapsed = time.perf_counter() - start
+    if errors:
+        raise errors[0]
+    return latencies, elapsed
+
+
+class Recorder:
+    """Thread-safe latency samples grouped by name."""
+
+    def __init__(self):
+        self.samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds):
+        with self._lock:
+            self.samples.setdefault(name, []).append(seconds)
+
+    def time(self, name, fn, *args):
+        start = time.perf_counter()
+        result = fn(*args)
+        self.record(name, time.perf_counter() - start)
+        return result
+
+
+def start_jsearch_stub(latency=0.0, pages=3, page_size=10, retry_after=None):
+    """Serves JSearch-shaped /search responses from a local thread; returns (server, base_url).
+
+    Statuses appended to server.faults are returned, in order, by the next requests instead
+    of a page (a 429 or 503 carries Retry-After: retry_after when given); server.requests counts
+    every request received.
+    """
+    from collections import deque
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import parse_qs, urlparse
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # Keep-alive, like the real API
+
+        def do_GET(self):
+            query = parse_qs(urlparse(self.path).query)
+            page = int(query.get("page", ["1"])[0])
+            title = query.get("query", ["job"])[0]
+            time.sleep(latency)
+            with server.lock:
+                server.requests += 1
+                status = server.faults.popleft() if server.faults else 200
+            if status != 200:
+                body = json.dumps({"message": "stub fault"}).encode()
+                self.send_response(status)
+                if status in (429, 503) and retry_after is not None:
+                    self.send_header("Retry-After", str(retry_after))
+            else:
+                count = page_size if page <= pages else 0
+                data = [{
+                    "job_title": f"{title} #{page}-{i}", "employer_name": f"Company {i % 7}",
+                    "job_city": "Austin", "job_state": "TX", "job_apply_link": f"https://jobs.example/{page}/{i}",
+                } for i in range(count)]
+                body = json.dumps({"data": data}).encode()
+                self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.faults = deque()
+    server.requests = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+# --- Database: concurrent signups, logins and ratings through the connection pool ---
+def bench_db(args):
+    import db
+
+    workdir = tempfile.mkdtemp(prefix="bench_db_")
+    db.configure(os.path.join(workdir, "users.db"), max_size=args.pool_size)
+    db.bootstrap()
+
+    def worker(index):
+        rng = random.Random(index)
+        email = f"user{index}@example.com"
+        assert db.add_user(f"User {index}", email, "secret")
+        local = []
+        for _ in range(args.ops):
+            start = time.perf_counter()
+            op = rng.random()
+            if op < 0.5:
+                assert db.check_user(email, "secret") is not None
+            elif op < 0.9:
+                db.add_rating(email, "⭐" * rng.randint(1, 5))
+                ratings[index] += 1
+            else:
+                db.get_all_users()
+            local.append(time.perf_counter() - start)
+        return local
+
+    ratings = [0] * args.threads
+    latencies, elapsed = run_threads(args.threads, worker)
+
+    # Correctness: every write must be visible exactly once
+    users = len(db.get_all_users())
+    stored = len(db.get_all_ratings())
+    ok = users == args.threads + 1 and stored == sum(ratings)
+    report("db: mixed login / rating / admin reads", latencies, elapsed, {
+        "threads": args.threads,
+        "users": f"{users} (expected {args.threads + 1})",
+        "ratings": f"{stored} (expected {sum(ratings)})",
+        "correct": ok,
+    })
+    return ok
+
+
+# --- Ratings: synchronous commits vs the write-behind queue ---
+def bench_ratings(args):
+    import db
+    from write_behind import WriteBehindQueue
+
+    workdir = tempfile.mkdtemp(prefix="bench_ratings_")
+    db.configure(os.path.join(workdir, "users.db"))
+    db.bootstrap()
+    emails = [f"user{i}@example.com" for i in range(args.threads)]
+    for email in emails:
+        db.add_user(email, email, "secret")
+
+    def sync_worker(index):
+        local = []
+        for _ in range(args.ops):
+            start = time.perf_counter()
+            db.add_rating(emails[index], "⭐⭐⭐⭐")
+            local.append(time.perf_counter() - start)
+        return local
+
+    latencies, elapsed = run_threads(args.threads, sync_worker)
+    report("ratings: synchronous add_rating", latencies, elapsed)
+
+    writer = WriteBehindQueue(db.add_ratings, name="bench-rating-writer")
+    def queued_worker(index):
+        local = []
+        for _ in range(args.ops):
+            start = time.perf_counter()
+            writer.submit((emails[index], 4, None))
+            local.append(time.perf_counter() - start)
+        return local
+
+    latencies, elapsed = run_threads(args.threads, queued_worker)
+    start = time.perf_counter()
+    writer.close()  # The shutdown path must leave nothing unwritten
+    drain = time.perf_counter() - start
+    expected = 2 * args.threads * args.ops
+    stored = db.get_rating_summary()["count"]
+    ok = stored == expected and len(db.get_all_ratings()) == expected
+    report("ratings: write-behind submit", latencies, elapsed, {
+        "batches": f"{writer.batches_written} for {writer.items_written} items",
+        "drain": f"{drain * 1000:.1f} ms on close()",
+        "stored": f"{stored} (expected {expected})",
+        "correct": ok,
+    })
+    batching_ok = bench_ratings_batching(args)
+    return bench_ratings_faults(args) and batching_ok and ok
+
+# Runs in a fresh interpreter: submits ratings and exits without close(); atexit must flush them
+EXIT_WITHOUT_CLOSE_CHILD = """
+import sys
+sys.path.insert(0, sys.argv[1])
+import db
+from write_behind import WriteBehindQueue
+db.configure(sys.argv[2])
+writer = WriteBehindQueue(db.add_ratings, max_latency=60, name="exit-child")
+for _ in range(int(sys.argv[3])):
+    writer.submit(("user0@example.com", 5, None))
+print(writer.pending())
+"""
+
+def bench_ratings_batching(args):
+    """Batches stay full under a burst, a lone item is flushed within max_latency, and a process
+    that exits without close() still writes everything through the atexit hook."""
+    import math
+    import db
+    from write_behind import WriteBehindQueue
+
+    checks = {}
+    written, lock = [], threading.Lock()
+    def flush(batch):
+        with lock:
+            written.append((time.perf_counter(), len(batch)))
+
+    # Burst: N items submitted at once are written in at most ceil(N / max_batch) transactions
+    burst, max_batch = args.threads * args.ops, 50
+    writer = WriteBehindQueue(flush, max_batch=max_batch, max_latency=0.5, name="bench-burst")
+    for i in range(burst):
+        writer.submit(i)
+    writer.flush()
+    bound = math.ceil(burst / max_batch)
+    checks["burst batching"] = (writer.items_written == burst and writer.batches_written <= bound,
+                                f"{burst} items in {writer.batches_written} batches (at most {bound})")
+
+    # Lone item: written once max_latency has passed, not held back waiting for a full batch
+    written.clear()
+    start = time.perf_counter()
+    writer.submit("lone")
+    writer.flush()
+    latency = written[0][0] - start
+    checks["lone item latency"] = (latency <= writer.max_latency + 0.1,
+                                   f"written after {latency * 1000:.0f} ms (max_latency {writer.max_latency * 1000:.0f} ms)")
+    writer.close()
+
+    # Exit without close(): the atexit hook drains the queue before the interpreter exits
+    workdir = tempfile.mkdtemp(prefix="bench_exit_")
+    path = os.path.join(workdir, "users.db")
+    db.configure(path)
+    db.bootstrap()
+    db.add_user("user0", "user0@example.com", "secret")
+    here = os.path.dirname(os.path.abspath(__file__))
+    out = subprocess.run([sys.executable, "-c", EXIT_WITHOUT_CLOSE_CHILD, here, path, str(args.ops)],
+                         capture_output=True, text=True)
+    pending = out.stdout.strip() or "?"
+    db.configure(path)  # Fresh connections, after the child's writes
+    stored = db.get_rating_summary()["count"]
+    checks["flush at exit without close()"] = (out.returncode == 0 and stored == args.ops,
+                                               f"{pending} pending at exit, {stored}/{args.ops} stored" + (f", {out.stderr[-200:]}" if out.returncode else ""))
+
+    ok = all(passed for passed, _ in checks.values())
+    report("ratings: write-behind batching and shutdown", [], 0, {
+        **{label: f"{'ok' if passed else 'FAILED'} ({detail})" for label, (passed, detail) in checks.items()},
+        "correct": ok,
+    })
+    return ok
+
+def bench_ratings_faults(args):
+    """Failing flush_fn: transient errors are retried, poison rows and outages dead-lettered, close() bounded."""
+    from write_behind import WriteBehindQueue
+
+    logging.getLogger("write_behind").setLevel(logging.CRITICAL)  # The failures below are deliberate
+    delays = (0.01, 0.02)
+    checks = {}
+
+    class Store:
+        """flush_fn that fails the next `failures` calls, and any batch holding a poison item."""
+        def __init__(self, failures=0, always=False):
+            self.failures, self.always = failures, always
+            self.rows, self.calls, self.dead = [], 0, []
+            self.lock = threading.Lock()
+
+        def flush(self, batch):
+            with self.lock:
+                self.calls += 1
+                if self.always or self.failures > 0 or "poison" in batch:
+                    self.failures -= 1
+                    raise RuntimeError("flush failed")
+                self.rows.extend(batch)
+
+    # Transient: two failed flushes, then everything lands exactly once
+    store = Store(failures=2)
+    writer = WriteBehindQueue(store.flush, max_latency=0.05, retry_delays=delays, dead_letter_fn=store.dead.extend, name="bench-transient")
+    items = list(range(args.ops))
+    for item in items:
+        writer.submit(item)
+    writer.close()
+    checks["transient failure retried"] = (sorted(store.rows) == items and not store.dead, f"{len(store.rows)}/{len(items)} written, {store.calls} flushes")
+
+    # Poison row: its batch gives up after the retries, the good rows are salvaged, later rows are not blocked
+    store = Store()
+    writer = WriteBehindQueue(store.flush, max_latency=0.05, retry_delays=delays, dead_letter_fn=store.dead.extend, name="bench-poison")
+    for item in [1, 2, "poison", 3]:
+        writer.submit(item)
+    writer.flush()
+    start = time.perf_counter()
+    writer.submit(4)
+    writer.flush()
+    after = time.perf_counter() - start
+    writer.close()
+    checks["poison row dead-lettered"] = (sorted(store.rows) == [1, 2, 3, 4] and store.dead == ["poison"] and writer.items_failed == 1,
+                                         f"written {sorted(store.rows)}, dead {store.dead}")
+    checks["later rows not blocked"] = (after < 1.0, f"next item written in {after * 1000:.0f} ms")
+
+    # Outage at shutdown: close() retries a bounded number of times, then dead-letters instead of hanging
+    store = Store(always=True)
+    writer = WriteBehindQueue(store.flush, max_latency=10, retry_delays=delays, dead_letter_fn=store.dead.extend, name="bench-outage")
+    for item in items:
+        writer.submit(item)
+    start = time.perf_counter()
+    writer.close()
+    elapsed = time.perf_counter() - start
+    checks["drop on shutdown"] = (sorted(store.dead) == items and not writer._thread.is_alive() and elapsed < 5,
+                                  f"{len(store.dead)} dead-lettered, close() took {elapsed * 1000:.0f} ms")
+
+    ok = all(passed for passed, _ in checks.values())
+    report("ratings: write-behind with a failing flush_fn", [], 0, {
+        **{label: f"{'ok' if passed else 'FAILED'} ({detail})" for label, (passed, detail) in checks.items()},
+        "correct": ok,
+    })
+    return ok
+
+
+# --- End-to-end flows: mentor, roadmap and jobs against the fake LLM and a JSearch stub ---
+INTERESTS = [
+    "I love data and statistics", "drawing and digital art", "video games and storytelling",
+    "biology and computers", "helping people and psychology", "building robots",
+    "writing and explaining things", "cloud servers and networking", "ethical hacking",
+    "music production", "sports analytics", "climate and sustainability",
+]
+LOCATIONS = ["USA", "London", "Remote", "Karachi", "Berlin"]
+
+def bench_flows(args):
+    import llm_cache
+    import llm_providers
+    import mentor_ai
+    from jobs_client import JSearchClient
+
+    workdir = tempfile.mkdtemp(prefix="bench_flows_")
+    cache = llm_cache.configure(os.path.join(workdir, "llm_cache.db"))
+    provider = llm_providers.set_provider(llm_providers.FakeProvider(latency=args.latency, chunk_delay=args.chunk_delay))
+    server, base_url = start_jsearch_stub(latency=args.jobs_latency)
+    client = JSearchClient("bench", base_url=base_url)
+    recorder = Recorder()
+    # Popular interests are requested far more often than rare ones (Zipf-like)
+    weights = [1 / (rank + 1) for rank in range(len(INTERESTS))]
+
+    def guidance(interests, field):
+        if not args.stream:
+            return mentor_ai.generate_guidance(interests, field)
+        start, first = time.perf_counter(), None
+        parts = []
+        for chunk in mentor_ai.stream_guidance(interests, field):
+            if first is None:
+                first = time.perf_counter() - start
+                recorder.record("mentor: guidance first chunk", first)
+            parts.append(chunk)
+        return "".join(parts)
+
+    def roadmap(field):
+        return mentor_ai.cached_roadmap_structure(field) or mentor_ai.generate_roadmap_structure(field)
+
+    def worker(index):
+        rng = random.Random(args.seed + index)
+        for _ in range(args.sessions):
+            start = time.perf_counter()
+            interests = rng.choices(INTERESTS, weights)[0]
+            fields = recorder.time("mentor: fields", mentor_ai.generate_fields, interests)
+            field = rng.choice(fields)
+            recorder.time("mentor: guidance", guidance, interests, field)
+            recorder.time("roadmap: structure", roadmap, field)
+            pager = client.pager(field, rng.choice(LOCATIONS))
+            recorder.time("jobs: first page", pager.load_more)
+            if rng.random() < 0.3:
+                recorder.time("jobs: load more", pager.load_more)
+            recorder.record("session total", time.perf_counter() - start)
+        return []
+
+    _, elapsed = run_threads(args.users, worker)
+    server.shutdown()
+
+    for name, samples in recorder.samples.items():
+        report(f"flows: {name}", samples, elapsed)
+    stats = cache.stats()
+    extra = {"sessions": f"{args.users * args.sessions} in {elapsed:.2f}s ({args.users * args.sessions / elapsed:.1f}/s)",
+             "llm calls": provider.calls}
+    for namespace, counts in sorted(stats.items()):
+        lookups = counts["hits"] + counts["misses"]
+        extra[f"{namespace} cache hits"] = f"{counts['hits'] / lookups:.0%} of {lookups}" if lookups else "n/a"
+    lookups = client.hits + client.misses
+    extra["jobs cache hits"] = f"{client.hits / lookups:.0%} of {lookups}" if lookups else "n/a"
+    extra["coalesced"] = f"{llm_cache.flights.coalesced} LLM, {client.coalesced} jobs"
+    report("flows: summary", [], elapsed, extra)
+    return True
+
+
+# --- Jobs client: retries on 429/5xx, Retry-After, and pagination against a faulty stub ---
+def bench_jobs(args):
+    import requests
+    from jobs_client import PAGE_SIZE, JSearchClient
+    from rate_limit import RateLimitExceeded, TokenBucket
+
+    server, base_url = start_jsearch_stub(pages=args.pages, retry_after=args.retry_after)
+    checks = {}
+
+    def case(faults, fn):
+        """Queues faults on the stub, runs fn(); returns (result or exception, requests seen, seconds)."""
+        server.faults.extend(faults)
+        before, start = server.requests, time.perf_counter()
+        try:
+            result = fn()
+        except Exception as e:
+            result = e
+        return result, server.requests - before, time.perf_counter() - start
+
+    # Transient 5xx: retried with backoff, without sleeping through a 503's Retry-After
+    limiter = TokenBucket("jsearch", rate=10.0, burst=10)
+    client = JSearchClient("bench", base_url=base_url, backoff_factor=0.01, limiter=limiter)
+    rows, seen, elapsed = case([503, 502], lambda: client.search_page("Stub Tester", "Austin"))
+    checks["transient 503 + 502 retried"] = (isinstance(rows, list) and len(rows) == PAGE_SIZE and seen == 3 and elapsed < 1.0,
+                                              f"{seen} requests in {elapsed:.2f}s, {len(rows) if isinstance(rows, list) else rows}")
+
+    # 429: not retried or slept through, whatever its Retry-After; the limiter pauses for it and
+    # the search fails over to an expired page when one is held, else raises RateLimitExceeded
+    error, seen, elapsed = case([429], lambda: client.search_page("Stub Tester", "Remote"))
+    checks["429 not waited out"] = (isinstance(error, RateLimitExceeded) and seen == 1 and elapsed < 1.0,
+                                    f"{seen} request, {type(error).__name__} after {elapsed:.2f}s (Retry-After {args.retry_after}s)")
+    checks["429 paused the limiter"] = (limiter.rate < limiter.max_rate and limiter.throttled == 1 and limiter.available() == 0,
+                                        f"rate {limiter.rate:.1f}/s, {limiter.available():.0f} tokens")
+    stale_client = JSearchClient("bench", base_url=base_url, cache_ttl=0)
+    fresh, _, _ = case([], lambda: stale_client.search_page("Stub Tester", "Austin"))
+    rows, seen, _ = case([429], lambda: stale_client.search_page("Stub Tester", "Austin"))
+    checks["429 serves expired page"] = (rows == fresh and stale_client.stale_served == 1 and seen == 1,
+                                         f"{stale_client.stale_served} stale page served")
+
+    # Persistent 5xx: gives up after max_retries and raises, without caching anything
+    client = JSearchClient("bench", base_url=base_url, backoff_factor=0.01, max_retries=args.max_retries)
+    error, seen, _ = case([503] * (args.max_retries + 1), lambda: client.search_page("Stub Tester", "Austin"))
+    checks["persistent 503 gives up"] = (isinstance(error, requests.HTTPError) and seen == args.max_retries + 1,
+                                         f"{seen} requests, {type(error).__name__}")
+    rows, seen, _ = case([], lambda: client.search_page("Stub Tester", "Austin"))
+    checks["failure not cached"] = (isinstance(rows, list) and len(rows) == PAGE_SIZE and seen == 1, f"{seen} requests")
+
+    # Pagination: pages are fetched once each, and an empty page ends the search for good
+    pager = client.pager("Stub Tester", "Austin")
+    sizes = []
+    while not pager.exhausted and len(sizes) <= args.pages + 1:
+        sizes.append(len(case([], pager.load_more)[0]))
+    _, seen, _ = case([], pager.load_more)
+    checks["pager exhausted"] = (pager.exhausted and sizes == [PAGE_SIZE] * args.pages + [0] and pager.pages_loaded == args.pages + 1,
+                                 f"page sizes {sizes}")
+    checks["no request after end"] = (seen == 0, f"{seen} requests")
+    _, seen, _ = case([], lambda: [client.pager("Stub Tester", "Austin").load_more() for _ in range(2)])
+    checks["earlier pages cached"] = (seen == 0, f"{seen} requests")
+    server.shutdown()
+
+    ok = all(passed for passed, _ in checks.values())
+    report("jobs: JSearch client against a faulty stub", [], 0, {
+        **{label: f"{'ok' if passed else 'FAILED'} ({detail})" for label, (passed, detail) in checks.items()},
+        "correct": ok,
+    })
+    return ok
+
+
+# --- Roadmap parsing: heading variations the model produces ---
+ROADMAP_LAYOUTS = {
+    "bold labels": ("""### 🎓 Phase 1: Foundations
+- **Timeline:** 0-3 Months
+- **Key Skills to Acquire:**
+  - Python
+  - Project management: planning
+- **Recommended Projects:**
+  1. A blog
+- **Networking & Growth:**
+  - Join a meetup
+### 🛠️ Phase 2: Building Skills
+- **Timeline:** 3-6 Months
+- **Key Skills to Acquire:** SQL, Statistics
+""", [("🎓 Phase 1: Foundations", "0-3 Months", ("Python", "Project management: planning"), ("A blog",), ("Join a meetup",)),
+      ("🛠️ Phase 2: Building Skills", "3-6 Months", ("SQL", "Statistics"), (), ())]),
+    "title mentions phases": ("""# 🚀 Your Data Scientist Roadmap in 2 Phases
+Expect 3 months for the first phase and 6 months for the second.
+### 🎓 Phase 1: Foundations
+- **Timeline:** 3 months
+### Phase 2: Growth
+- **Timeline:** 6 months
+""", [("🎓 Phase 1: Foundations", "3 months", (), (), ()), ("Phase 2: Growth", "6 months", (), (), ())]),
+    "subsection headings, same level": ("""### 🎓 Phase 1: Foundations
+### Timeline
+0-3 Months
+### 🛠️ Key Skills
+- Python
+### Phase 2: Next
+### Recommended Projects
+1. A dashboard
+### Networking & Growth
+- Find a mentor
+""", [("🎓 Phase 1: Foundations", "0-3 Months", ("Python",), (), ()), ("Phase 2: Next", "", (), ("A dashboard",), ("Find a mentor",))]),
+    "subsection headings, deeper level": ("""## Phase 1: Foundations
+#### Timeline: 0-3 Months
+#### Key Skills: Python, SQL
+## Phase 2: Next
+#### Timeline
+3-6 Months
+""", [("Phase 1: Foundations", "0-3 Months", ("Python", "SQL"), (), ()), ("Phase 2: Next", "3-6 Months", (), (), ())]),
+    "bold phase lines": ("""**Phase 1: Foundations**
+- **Timeline:** 0-3 Months
+**Phase 2: Next**
+- **Timeline:** 3-6 Months
+""", [("Phase 1: Foundations", "0-3 Months", (), (), ()), ("Phase 2: Next", "3-6 Months", (), (), ())]),
+    "no phases": ("Just learn things and apply to jobs.\n", []),
+}
+
+def bench_parse(args):
+    import roadmap
+
+    checks = {}
+    for name, (markdown, expected) in ROADMAP_LAYOUTS.items():
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            roadmap.parse_roadmap.__wrapped__(markdown)
+        elapsed = time.perf_counter() - start
+        got = [(p.title, p.timeline, p.skills, p.projects, p.networking) for p in roadmap.parse_roadmap(markdown).phases]
+        checks[name] = (got == expected, f"{len(got)} phases, {elapsed / args.repeat * 1e6:.0f} µs/parse" if got == expected else f"got {got}")
+    ok = all(passed for passed, _ in checks.values())
+    report("parse: roadmap heading variations", [], 0, {
+        **{label: f"{'ok' if passed else 'FAILED'} ({detail})" for label, (passed, detail) in checks.items()},
+        "correct": ok,
+    })
+    return ok
+
+
+# --- Streaming: progressive roadmap phases and the cache fill of completed vs abandoned streams ---
+def bench_stream(args):
+    import llm_cache
+    import llm_providers
+    import mentor_ai
+    import roadmap
+
+    workdir = tempfile.mkdtemp(prefix="bench_stream_")
+    llm_cache.configure(os.path.join(workdir, "llm_cache.db"))
+    provider = llm_providers.set_provider(llm_providers.FakeProvider(chunk_size=args.chunk_size, chunk_delay=args.chunk_delay))
+
+    def consume(field, stop_after=None):
+        """Streams a roadmap through iter_phases; returns (phase count per chunk, text, first-phase s, total s)."""
+        chunks = mentor_ai.stream_roadmap(field)
+        counts, text, first, start = [], "", None, time.perf_counter()
+        try:
+            for phases, text in roadmap.iter_phases(chunks):
+                counts.append(len(phases))
+                if phases and first is None:
+                    first = time.perf_counter() - start
+                if stop_after is not None and len(counts) >= stop_after:
+                    break
+        finally:
+            chunks.close()  # What Streamlit does when a rerun interrupts the script
+        return counts, text, first, time.perf_counter() - start
+
+    # Completed: phases appear one by one, then the text and its structure are cached
+    counts, text, first, total = consume("Stream Tester")
+    expected = len(roadmap.parse_roadmap(text).phases)
+    progressive = counts == sorted(counts) and counts[-1] == expected and counts.index(expected) > counts.index(1)
+    cached = mentor_ai.cached_roadmap("Stream Tester") == text
+    structure = mentor_ai.remember_roadmap_structure("Stream Tester", mentor_ai.cached_roadmap("Stream Tester"))
+    calls = provider.calls
+    replay = list(mentor_ai.stream_roadmap("Stream Tester"))
+    served_from_cache = replay == [text] and provider.calls == calls
+    completed_ok = progressive and cached and len(structure.phases) == expected and served_from_cache
+    report("stream: completed roadmap", [total], total, {
+        "chunks": len(counts),
+        "first phase": f"{first * 1000:.1f} ms of {total * 1000:.1f} ms",
+        "phases per chunk": " ".join(str(c) for c in dict.fromkeys(counts)),
+        "cache filled": cached,
+        "replayed from cache": served_from_cache,
+        "correct": completed_ok,
+    })
+
+    # Abandoned: nothing is cached, and the next request streams afresh instead of waiting on it
+    counts, partial, _, total = consume("Abandon Tester", stop_after=3)
+    abandoned_cached = mentor_ai.cached_roadmap("Abandon Tester") is not None
+    structure_cached = mentor_ai.cached_roadmap_structure("Abandon Tester") is not None
+    calls = provider.calls
+    counts, text, _, _ = consume("Abandon Tester")
+    restarted = provider.calls == calls + 1 and mentor_ai.cached_roadmap("Abandon Tester") == text and len(text) > len(partial)
+    abandoned_ok = not abandoned_cached and not structure_cached and restarted
+    report("stream: abandoned roadmap", [total], total, {
+        "chunks read": 3,
+        "cached after abandon": abandoned_cached or structure_cached,
+        "next request restarted": restarted,
+        "correct": abandoned_ok,
+    })
+    return completed_ok and abandoned_ok
+
+
+# --- Logins: throughput of the KDF at different scrypt costs, cold and cached ---
+def bench_login(args):
+    import hashlib
+    import db
+    import passwords
+
+    ok = True
+    for log_n in args.costs:
+        passwords.SCRYPT_LOG_N = log_n
+        passwords.verified.clear()
+        workdir = tempfile.mkdtemp(prefix="bench_login_")
+        db.configure(os.path.join(workdir, "users.db"))
+        db.bootstrap()
+        emails = [f"user{i}@example.com" for i in range(args.threads)]
+        for email in emails:
+            db.add_user(email, email, "secret")
+        # A pre-KDF row, as found in an existing users_v5.db
+        with db.get_pool().transaction() as conn:
+            conn.execute("INSERT INTO users (fullname, email, password_hash) VALUES (?, ?, ?)",
+                         ("Legacy", "legacy@example.com", hashlib.sha256(b"secret").hexdigest()))
+
+        def worker(index, cached):
+            local = []
+            for _ in range(args.logins):
+                if not cached:
+                    passwords.verified.clear()
+                start = time.perf_counter()
+                assert db.check_user(emails[index], "secret") is not None
+                local.append(time.perf_counter() - start)
+            return local
+
+        latencies, elapsed = run_threads(args.threads, lambda index: worker(index, False))
+        report(f"login: scrypt n=2**{log_n}, cold (KDF every time)", latencies, elapsed, {
+            "kdf workers": passwords.KDF_WORKERS,
+        })
+        latencies, elapsed = run_threads(args.threads, lambda index: worker(index, True))
+        cached = (latencies, elapsed, passwords.verified.hits)
+
+        upgraded = db.check_user("legacy@example.com", "secret") is not None
+        with db.get_pool().connection() as conn:
+            (stored,) = conn.execute("SELECT password_hash FROM users WHERE email = ?", ("legacy@example.com",)).fetchone()
+        rejected = db.check_user("legacy@example.com", "wrong") is None and db.check_user("nobody@example.com", "secret") is None
+        correct = upgraded and stored.startswith(f"scrypt${log_n}$") and rejected
+        ok = ok and correct
+        report(f"login: scrypt n=2**{log_n}, verification cache", cached[0], cached[1], {
+            "cache hits": cached[2],
+            "legacy row rehashed": stored.split("$")[0],
+            "correct": correct,
+        })
+    return ok
+
+
+# --- Startup: cold start of a fresh process and per-rerun cost of the main pages ---
+HEAVY_MODULES = ("pandas", "requests", "plotly", "google.generativeai")
+SIDEBAR_LABELS = {"home": "🏠 Home", "admin": "🔑 Admin Dashboard"}
+
+# Runs in a fresh interpreter: imports the test harness, then renders the login page once.
+# The harness itself imports some heavy modules (plotly), so only modules that first
+# appear during the runs are attributed to the app.
+COLD_START_CHILD = """
+import json, sys, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+harness = time.perf_counter()
+preloaded = set(sys.modules)
+at = AppTest.from_file(sys.argv[1], default_timeout=120)
+at.secrets["GEMINI_API_KEY"] = at.secrets["JSEARCH_API_KEY"] = "unused"
+at.run()
+first_run = time.perf_counter() - harness
+at.run()
+print(json.dumps({"harness": harness - start, "first_run": first_run, "second_run": time.perf_counter() - harness - first_run,
+                  "errors": len(at.exception), "loaded": [m for m in %r if m in sys.modules and m not in preloaded],
+                  "preloaded": [m for m in %r if m in preloaded]}))
+""" % (HEAVY_MODULES, HEAVY_MODULES)
+
+def _app_copy():
+    """Copies the app into a scratch directory, so its databases are created fresh there."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    workdir = tempfile.mkdtemp(prefix="bench_startup_")
+    for name in os.listdir(here):
+        if name.endswith(".py") or name == "style.css":
+            shutil.copy(os.path.join(here, name), workdir)
+    if os.path.isdir(os.path.join(here, "assets")):
+        shutil.copytree(os.path.join(here, "assets"), os.path.join(workdir, "assets"))
+    return workdir
+
+def bench_startup(args):
+    from streamlit.testing.v1 import AppTest
+
+    workdir = _app_copy()
+    os.environ.setdefault("MENTOR_LLM_PROVIDER", "fake")
+    # Deprecation notices logged on every rerun would bury the report
+    logging.getLogger("streamlit.deprecation_util").addFilter(lambda record: record.levelno >= logging.ERROR)
+    script = os.path.join(workdir, "app.py")
+
+    samples = []
+    for _ in range(args.cold):
+        out = subprocess.run([sys.executable, "-c", COLD_START_CHILD, script], cwd=workdir, capture_output=True, text=True)
+        if out.returncode:
+            print(out.stderr[-2000:])
+            return False
+        samples.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    ok = all(sample["errors"] == 0 for sample in samples)
+    report("startup: cold start, login page", [s["first_run"] for s in samples], sum(s["first_run"] for s in samples), {
+        "test harness import": f"{statistics.median(s['harness'] for s in samples) * 1000:.0f} ms (not included)",
+        "second run": f"{statistics.median(s['second_run'] for s in samples) * 1000:.1f} ms",
+        "heavy modules loaded": ", ".join(samples[-1]["loaded"]) or "none",
+        "already loaded by harness": ", ".join(samples[-1]["preloaded"]) or "none",
+        "errors": sum(s["errors"] for s in samples),
+    })
+
+    os.chdir(workdir)
+    sys.path.insert(0, workdir)
+    for page in ("login", "home", "admin"):
+        at = AppTest.from_file(script, default_timeout=120)
+        at.secrets["GEMINI_API_KEY"] = at.secrets["JSEARCH_API_KEY"] = "unused"
+        if page != "login":
+            at.session_state["logged_in"] = True
+            at.session_state["fullname"] = "Admin User"
+            at.session_state["email"] = "admin@example.com"
+            at.session_state["role"] = "admin"
+            at.session_state["page"] = page
+            at.session_state["sidebar_nav"] = SIDEBAR_LABELS[page]
+        start = time.perf_counter()
+        at.run()  # First render on this page, with the process already warm
+        first = time.perf_counter() - start
+        latencies = []
+        for _ in range(args.reruns):
+            start = time.perf_counter()
+            at.run()
+            latencies.append(time.perf_counter() - start)
+        errors = len(at.exception)
+        ok = ok and errors == 0
+        report(f"startup: rerun, {page} page", latencies, sum(latencies), {
+            "first render": f"{first * 1000:.1f} ms",
+            "errors": errors,
+        })
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless benchmarks for Career Mentor")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("db", help="Concurrency stress test of the database layer")
+    p.add_argument("--threads", type=int, default=16)
+    p.add_argument("--ops", type=int, default=200, help="Operations per thread")
+    p.add_argument("--pool-size", type=int, default=8)
+    p.set_defaults(func=bench_db)
+
+    p = sub.add_parser("ratings", help="Rating submission latency, synchronous vs write-behind")
+    p.add_argument("--threads", type=int, default=8)
+    p.add_argument("--ops", type=int, default=200, help="Ratings per thread")
+    p.set_defaults(func=bench_ratings)
+
+    p = sub.add_parser("flows", help="Mentor, roadmap and jobs flows against the fake LLM and a local JSearch stub")
+    p.add_argument("--users", type=int, default=20, help="Concurrent simulated users")
+    p.add_argument("--sessions", type=int, default=10, help="Sessions per user")
+    p.add_argument("--latency", type=float, default=0.2, help="Fake LLM seconds to first byte")
+    p.add_argument("--chunk-delay", type=float, default=0.02, help="Fake LLM seconds between streamed chunks")
+    p.add_argument("--jobs-latency", type=float, default=0.1, help="JSearch stub seconds per request")
+    p.add_argument("--stream", action="store_true", help="Stream guidance and record time to first chunk")
+    p.add_argument("--seed", type=int, default=0)
+    p.set_defaults(func=bench_flows)
+
+    p = sub.add_parser("jobs", help="JSearch client retries, Retry-After and pagination against a local stub that fails on cue")
+    p.add_argument("--pages", type=int, default=2, help="Full pages the stub serves before running out")
+    p.add_argument("--retry-after", type=int, default=3600, help="Retry-After seconds sent with the stub's 429 and 503")
+    p.add_argument("--max-retries", type=int, default=3)
+    p.set_defaults(func=bench_jobs)
+
+    p = sub.add_parser("parse", help="Roadmap parser against the heading layouts models produce")
+    p.add_argument("--repeat", type=int, default=200, help="Parses timed per layout")
+    p.set_defaults(func=bench_parse)
+
+    p = sub.add_parser("stream", help="Streamed roadmap phases, cache fill, and abandoned streams against the fake LLM")
+    p.add_argument("--chunk-size", type=int, default=32, help="Fake LLM characters per streamed chunk")
+    p.add_argument("--chunk-delay", type=float, default=0.005, help="Fake LLM seconds between streamed chunks")
+    p.set_defaults(func=bench_stream)
+
+    p = sub.add_parser("login", help="Logins per second at different password hashing costs")
+    p.add_argument("--threads", type=int, default=8)
+    p.add_argument("--logins", type=int, default=10, help="Logins per thread")
+    p.add_argument("--costs", type=int, nargs="+", default=[10, 12, 14], help="scrypt cost as log2(n)")
+    p.set_defaults(func=bench_login)
+
+    p = sub.add_parser("startup", help="Cold-start time and per-rerun cost of the login, home and admin pages")
+    p.add_argument("--cold", type=int, default=3, help="Fresh processes to time")
+    p.add_argument("--reruns", type=int, default=20, help="Reruns timed per page")
+    p.set_defaults(func=bench_startup)
+
+    args = parser.parse_args(argv)
+    return 0 if args.func(args) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
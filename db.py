@@ -0,0 +1,468 @@
+# ======================================================================================
+# DATABASE LOGIC - pooled, WAL-mode access to users_v5.db
+# ======================================================================================
+# Every Streamlit session thread borrows a connection from a small pool instead of
+# sharing one sqlite3 connection and its cursors. Connections are long-lived, so their
+# prepared-statement caches are reused across queries.
+
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from metrics import timed
+from passwords import dummy_hash, hash_password, run_kdf, verified, verify_password
+
+DB_NAME = "users_v5.db" # Using a new DB file for the new structure
+POOL_SIZE = 8
+POOL_TIMEOUT = 10  # Seconds to wait for a free connection before giving up
+BUSY_TIMEOUT_MS = 5000
+STATEMENT_CACHE_SIZE = 128
+
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",  # Readers never block the writer and vice versa
+    "PRAGMA synchronous=NORMAL",  # Durable in WAL mode, without an fsync per commit
+    f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}",
+    "PRAGMA cache_size=-8000",  # ~8 MB page cache per connection
+    "PRAGMA temp_store=MEMORY",
+)
+
+
+class ConnectionPool:
+    """A bounded pool of SQLite connections that are safe to hand between threads one at a time."""
+
+    def __init__(self, path=DB_NAME, max_size=POOL_SIZE, timeout=POOL_TIMEOUT):
+        self.path = path
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()  # LIFO keeps the warmest connections busy
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.path,
+            timeout=BUSY_TIMEOUT_MS / 1000,
+            isolation_level=None,  # Autocommit; transaction() opens explicit transactions
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE,
+        )
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.max_size:
+                self._created += 1
+                create = True
+            else:
+                create = False
+        if create:
+            try:
+                return self._connect()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+        try:
+            with timed("db.pool_wait"):
+                return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(f"No database connection became free within {self.timeout}s")
+
+    @contextmanager
+    def connection(self):
+        """Borrows a connection for reads (autocommit)."""
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put(conn)
+
+    @contextmanager
+    def transaction(self):
+        """Borrows a connection inside BEGIN IMMEDIATE ... COMMIT, rolling back on error."""
+        with self.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+
+    def close(self):
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool()
+    return _pool
+
+def configure(path=DB_NAME, **kwargs):
+    """Replaces the shared pool, e.g. to run a benchmark against a scratch database."""
+    global _pool, _bootstrapped
+    with _pool_lock:
+        _bootstrapped = False
+        if _pool is not None:
+            _pool.close()
+        _pool = ConnectionPool(path, **kwargs)
+    return _pool
+
+
+# --- Schema migrations ---
+# Each migration runs exactly once per database file, in order, and is recorded in
+# schema_version. Add new ones at the end instead of creating another users_vN.db.
+def _create_base_tables(conn):
+    conn.execute('CREATE TABLE IF NOT EXISTS users (id INTEGER PRIMARY KEY, fullname TEXT NOT NULL, email TEXT UNIQUE NOT NULL, password_hash TEXT NOT NULL, role TEXT NOT NULL DEFAULT "user")')
+    if conn.execute("SELECT 1 FROM users WHERE email = ?", ('admin@example.com',)).fetchone() is None:
+        admin_pass_hash = hash_password('admin123')
+        conn.execute("INSERT INTO users (fullname, email, password_hash, role) VALUES (?, ?, ?, ?)", ('Admin User', 'admin@example.com', admin_pass_hash, 'admin'))
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS ratings (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_email TEXT NOT NULL,
+            rating INTEGER NOT NULL,
+            submitted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_email) REFERENCES users (email)
+        )
+    ''')
+
+MIGRATIONS = [
+    (1, "users and ratings tables", _create_base_tables),
+    (2, "ratings indexes", [
+        "CREATE INDEX IF NOT EXISTS idx_ratings_user_email ON ratings (user_email)",
+        "CREATE INDEX IF NOT EXISTS idx_ratings_submitted_at ON ratings (submitted_at)",
+    ]),
+    (3, "daily ratings rollup", [
+        """
+        CREATE TABLE IF NOT EXISTS rating_daily (
+            day TEXT PRIMARY KEY,
+            count INTEGER NOT NULL DEFAULT 0,
+            total INTEGER NOT NULL DEFAULT 0,
+            stars_1 INTEGER NOT NULL DEFAULT 0,
+            stars_2 INTEGER NOT NULL DEFAULT 0,
+            stars_3 INTEGER NOT NULL DEFAULT 0,
+            stars_4 INTEGER NOT NULL DEFAULT 0,
+            stars_5 INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+        """
+        INSERT OR REPLACE INTO rating_daily (day, count, total, stars_1, stars_2, stars_3, stars_4, stars_5)
+        SELECT date(submitted_at), COUNT(*), SUM(rating),
+               SUM(rating = 1), SUM(rating = 2), SUM(rating = 3), SUM(rating = 4), SUM(rating = 5)
+        FROM ratings GROUP BY date(submitted_at)
+        """,
+    ]),
+    (4, "saved plans", [
+        """
+        CREATE TABLE IF NOT EXISTS plans (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_email TEXT NOT NULL,
+            interests TEXT NOT NULL,
+            interests_hash TEXT NOT NULL,
+            token_count INTEGER NOT NULL,
+            fields TEXT NOT NULL,
+            chosen_field TEXT,
+            guidance TEXT,
+            guidance_hash TEXT,
+            roadmap TEXT,
+            roadmap_hash TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (user_email, interests_hash),
+            FOREIGN KEY (user_email) REFERENCES users (email)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_plans_user_updated ON plans (user_email, updated_at)",
+        # Inverted index of interest tokens, for finding plans with near-duplicate interests
+        "CREATE TABLE IF NOT EXISTS plan_tokens (token TEXT NOT NULL, plan_id INTEGER NOT NULL, PRIMARY KEY (token, plan_id)) WITHOUT ROWID",
+        "CREATE INDEX IF NOT EXISTS idx_plan_tokens_plan ON plan_tokens (plan_id)",
+    ]),
+]
+
+@timed("db.init_db")
+def init_db(pool=None):
+    """Applies any pending migrations. Returns the list of versions applied."""
+    pool = pool or get_pool()
+    applied = []
+    # BEGIN IMMEDIATE serializes concurrent bootstraps from several workers
+    with pool.transaction() as conn:
+        conn.execute("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER PRIMARY KEY, name TEXT NOT NULL, applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)")
+        (current,) = conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()
+        for version, name, migration in MIGRATIONS:
+            if version <= current:
+                continue
+            if callable(migration):
+                migration(conn)
+            else:
+                for statement in migration:
+                    conn.execute(statement)
+            conn.execute("INSERT INTO schema_version (version, name) VALUES (?, ?)", (version, name))
+            applied.append(version)
+    return applied
+
+_bootstrapped = False
+_bootstrap_lock = threading.Lock()
+
+@timed("db.bootstrap")
+def bootstrap():
+    """Brings the schema up to date once per process; later calls (every rerun) cost nothing."""
+    global _bootstrapped
+    if _bootstrapped:
+        return
+    with _bootstrap_lock:
+        if not _bootstrapped:
+            init_db()
+            _bootstrapped = True
+
+@timed("db.add_user")
+def add_user(fullname, email, password):
+    password_hash = run_kdf(hash_password, password)
+    try:
+        with get_pool().transaction() as conn:
+            conn.execute("INSERT INTO users (fullname, email, password_hash) VALUES (?, ?, ?)", (fullname, email, password_hash))
+        return True
+    except sqlite3.IntegrityError: return False
+
+@timed("db.check_user")
+def check_user(email, password):
+    """Returns (fullname, role) if the password matches, upgrading legacy or outdated hashes on the way."""
+    with get_pool().connection() as conn:
+        row = conn.execute("SELECT fullname, role, password_hash FROM users WHERE email = ?", (email,)).fetchone()
+    if row is None:
+        run_kdf(verify_password, password, dummy_hash())
+        return None
+    fullname, role, stored = row
+    if verified.check(email, password, stored):
+        return fullname, role
+    matches, needs_rehash = run_kdf(verify_password, password, stored)
+    if not matches:
+        return None
+    if needs_rehash:
+        new_hash = run_kdf(hash_password, password)
+        with get_pool().transaction() as conn:
+            # Only replace the hash that was verified, in case it changed meanwhile
+            conn.execute("UPDATE users SET password_hash = ? WHERE email = ? AND password_hash = ?", (new_hash, email, stored))
+        stored = new_hash
+    verified.remember(email, password, stored)
+    return fullname, role
+
+@timed("db.get_all_users")
+def get_all_users():
+    with get_pool().connection() as conn:
+        return conn.execute("SELECT id, fullname, email, role FROM users").fetchall()
+
+@timed("db.count_users")
+def count_users(search=""):
+    with get_pool().connection() as conn:
+        if not search:
+            return conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+        pattern = f"%{search}%"
+        return conn.execute("SELECT COUNT(*) FROM users WHERE fullname LIKE ? OR email LIKE ?", (pattern, pattern)).fetchone()[0]
+
+@timed("db.get_users_page")
+def get_users_page(limit, offset=0, search=""):
+    """One page of users ordered by id, optionally filtered by a name/email substring."""
+    with get_pool().connection() as conn:
+        if not search:
+            return conn.execute("SELECT id, fullname, email, role FROM users ORDER BY id LIMIT ? OFFSET ?", (limit, offset)).fetchall()
+        pattern = f"%{search}%"
+        return conn.execute(
+            "SELECT id, fullname, email, role FROM users WHERE fullname LIKE ? OR email LIKE ? ORDER BY id LIMIT ? OFFSET ?",
+            (pattern, pattern, limit, offset),
+        ).fetchall()
+
+# --- NEW: Functions to handle ratings ---
+# Every rating also updates its day's row in rating_daily (count, sum and a 1-5 star
+# histogram), so dashboard metrics never have to scan the ratings table.
+ROLLUP_UPSERT = """
+    INSERT INTO rating_daily (day, count, total, stars_1, stars_2, stars_3, stars_4, stars_5)
+    VALUES (date(?), 1, ?, ? = 1, ? = 2, ? = 3, ? = 4, ? = 5)
+    ON CONFLICT(day) DO UPDATE SET
+        count = count + 1, total = total + excluded.total,
+        stars_1 = stars_1 + excluded.stars_1, stars_2 = stars_2 + excluded.stars_2,
+        stars_3 = stars_3 + excluded.stars_3, stars_4 = stars_4 + excluded.stars_4,
+        stars_5 = stars_5 + excluded.stars_5
+"""
+
+def add_rating(user_email, rating_value):
+    """Saves a user's rating to the database."""
+    rating_int = len(rating_value) # Convert '⭐⭐⭐' to 3
+    add_ratings([(user_email, rating_int, None)])
+
+@timed("db.add_ratings")
+def add_ratings(rows):
+    """Writes many (user_email, rating, submitted_at) rows and their rollup updates in one transaction.
+
+    submitted_at is a UTC 'YYYY-MM-DD HH:MM:SS' string, or None for now; this is the flush
+    function behind the rating write-behind queue.
+    """
+    with get_pool().transaction() as conn:
+        (now,) = conn.execute("SELECT CURRENT_TIMESTAMP").fetchone()
+        rows = [(email, rating, submitted_at or now) for email, rating, submitted_at in rows]
+        conn.executemany("INSERT INTO ratings (user_email, rating, submitted_at) VALUES (?, ?, ?)", rows)
+        conn.executemany(ROLLUP_UPSERT, [(submitted_at,) + (rating,) * 6 for _, rating, submitted_at in rows])
+
+@timed("db.get_all_ratings")
+def get_all_ratings():
+    """Fetches all ratings for the admin dashboard."""
+    with get_pool().connection() as conn:
+        # Join with users table to get the user's full name, which is more user-friendly
+        return conn.execute("""
+            SELECT r.id, u.fullname, r.user_email, r.rating, r.submitted_at
+            FROM ratings r
+            JOIN users u ON r.user_email = u.email
+            ORDER BY r.submitted_at DESC
+        """).fetchall()
+
+def _ratings_filter(stars, email):
+    clauses, params = [], []
+    if stars:
+        clauses.append(f"r.rating IN ({', '.join('?' * len(stars))})")
+        params.extend(stars)
+    if email:
+        clauses.append("r.user_email = ?")
+        params.append(email)
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+@timed("db.count_ratings")
+def count_ratings(stars=None, email=""):
+    """Number of ratings matching the filters; star-only filters are answered from the rollup."""
+    if not email:
+        summary = get_rating_summary()
+        return sum(summary["histogram"][s] for s in (stars or range(1, 6)))
+    where, params = _ratings_filter(stars, email)
+    with get_pool().connection() as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM ratings r{where}", params).fetchone()[0]
+
+@timed("db.get_ratings_page")
+def get_ratings_page(limit, offset=0, stars=None, email=""):
+    """One page of ratings, newest first, optionally filtered by star values and user email."""
+    where, params = _ratings_filter(stars, email)
+    with get_pool().connection() as conn:
+        return conn.execute(f"""
+            SELECT r.id, u.fullname, r.user_email, r.rating, r.submitted_at
+            FROM ratings r
+            JOIN users u ON r.user_email = u.email
+            {where}
+            ORDER BY r.submitted_at DESC, r.id DESC
+            LIMIT ? OFFSET ?
+        """, params + [limit, offset]).fetchall()
+
+@timed("db.get_rating_summary")
+def get_rating_summary():
+    """Total count, star sum, average and 1-5 histogram, summed over the daily rollup."""
+    with get_pool().connection() as conn:
+        row = conn.execute("""
+            SELECT COALESCE(SUM(count), 0), COALESCE(SUM(total), 0),
+                   COALESCE(SUM(stars_1), 0), COALESCE(SUM(stars_2), 0), COALESCE(SUM(stars_3), 0),
+                   COALESCE(SUM(stars_4), 0), COALESCE(SUM(stars_5), 0)
+            FROM rating_daily
+        """).fetchone()
+    count, total = row[0], row[1]
+    return {
+        "count": count,
+        "total": total,
+        "average": total / count if count else None,
+        "histogram": {stars: row[1 + stars] for stars in range(1, 6)},
+    }
+
+@timed("db.get_rating_daily")
+def get_rating_daily(days=90):
+    """(day, count, average) for the most recent days that received ratings, oldest first."""
+    with get_pool().connection() as conn:
+        rows = conn.execute(
+            "SELECT day, count, CAST(total AS REAL) / count FROM rating_daily ORDER BY day DESC LIMIT ?", (days,)
+        ).fetchall()
+    return rows[::-1]
+
+# --- Saved plans (see plans.py) ---
+PLAN_COLUMNS = "id, user_email, interests, fields, chosen_field, guidance, roadmap, updated_at"
+
+@timed("db.save_plan")
+def save_plan(user_email, interests, interests_hash, tokens, fields):
+    """Creates or refreshes the user's plan for these interests and indexes its tokens. Returns its id."""
+    with get_pool().transaction() as conn:
+        (plan_id,) = conn.execute("""
+            INSERT INTO plans (user_email, interests, interests_hash, token_count, fields)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(user_email, interests_hash) DO UPDATE SET
+                interests = excluded.interests, fields = excluded.fields, updated_at = CURRENT_TIMESTAMP
+            RETURNING id
+        """, (user_email, interests, interests_hash, len(tokens), fields)).fetchone()
+        conn.execute("DELETE FROM plan_tokens WHERE plan_id = ?", (plan_id,))
+        conn.executemany("INSERT INTO plan_tokens (token, plan_id) VALUES (?, ?)", [(token, plan_id) for token in tokens])
+    return plan_id
+
+@timed("db.update_plan")
+def update_plan(plan_id, chosen_field, content_column, content, content_hash):
+    """Stores the guidance or roadmap of a plan; skips the write when the content hash is unchanged.
+
+    Choosing a different field drops the other column, which belonged to the previous field.
+    """
+    other = {"guidance": "roadmap", "roadmap": "guidance"}[content_column]
+    with get_pool().transaction() as conn:
+        conn.execute(f"""
+            UPDATE plans SET
+                {content_column} = ?, {content_column}_hash = ?,
+                {other} = CASE WHEN chosen_field IS ? THEN {other} END,
+                {other}_hash = CASE WHEN chosen_field IS ? THEN {other}_hash END,
+                chosen_field = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ? AND (chosen_field IS NOT ? OR {content_column}_hash IS NOT ?)
+        """, (content, content_hash, chosen_field, chosen_field, chosen_field, plan_id, chosen_field, content_hash))
+
+@timed("db.get_plan")
+def get_plan(plan_id):
+    with get_pool().connection() as conn:
+        return conn.execute(f"SELECT {PLAN_COLUMNS} FROM plans WHERE id = ?", (plan_id,)).fetchone()
+
+@timed("db.get_latest_plan")
+def get_latest_plan(user_email):
+    with get_pool().connection() as conn:
+        return conn.execute(
+            f"SELECT {PLAN_COLUMNS} FROM plans WHERE user_email = ? ORDER BY updated_at DESC, id DESC LIMIT 1", (user_email,)
+        ).fetchone()
+
+@timed("db.find_plan_by_hash")
+def find_plan_by_hash(user_email, interests_hash):
+    with get_pool().connection() as conn:
+        return conn.execute(
+            f"SELECT {PLAN_COLUMNS} FROM plans WHERE user_email = ? AND interests_hash = ?", (user_email, interests_hash)
+        ).fetchone()
+
+@timed("db.find_similar_plans")
+def find_similar_plans(tokens, limit=20):
+    """(plan_id, shared_tokens, token_count) for the plans sharing the most tokens, best first."""
+    if not tokens:
+        return []
+    with get_pool().connection() as conn:
+        return conn.execute(f"""
+            SELECT p.id, COUNT(*) AS shared, p.token_count
+            FROM plan_tokens t JOIN plans p ON p.id = t.plan_id
+            WHERE t.token IN ({', '.join('?' * len(tokens))})
+            GROUP BY p.id
+            ORDER BY shared DESC, p.updated_at DESC
+            LIMIT ?
+        """, list(tokens) + [limit]).fetchall()
@@ -0,0 +1,258 @@
+# ======================================================================================
+# JOB INDEX - local, deduplicated store of JSearch postings with full-text and facet search
+# ======================================================================================
+# Every page fetched from JSearch is ingested here. A posting seen again, through another
+# search or with its apply link reformatted, updates the existing row instead of adding a
+# duplicate. Searches are answered from this index first:
+#   - a (career, location) fetched within QUERY_TTL is served entirely from here;
+#   - otherwise title/location full-text matches seen by any search within QUERY_TTL are
+#     used if there are at least PAGE_SIZE;
+#   - only then does the Jobs page call the API.
+# Older postings are still shown next to fresh ones until they expire.
+# Company/location facets and the "filter within results" box are plain SQL on top, so
+# refining a search never spends API quota. Postings not seen for JOB_TTL expire.
+
+import re
+import threading
+import time
+from urllib.parse import urlsplit, urlunsplit
+
+import metrics
+from db import ConnectionPool
+from llm_cache import normalize_text
+
+JOBS_DB_NAME = "job_index.db"
+JOB_TTL = 3 * 24 * 3600  # A posting not returned by any search for this long is dropped
+QUERY_TTL = 6 * 3600  # A search is re-fetched from the API after this long
+EXPIRE_EVERY = 50  # Ingested pages between expiry sweeps
+MAX_RESULTS = 500
+TOKEN = re.compile(r"\w+", re.UNICODE)
+TRACKING_PARAMS = re.compile(r"^(utm_[a-z]+|gclid|fbclid|ref|refid|src|source|trk|trackingid)$", re.I)
+
+
+def link_key(link):
+    """The apply link without scheme, www., tracking parameters or a trailing slash."""
+    if not link:
+        return None
+    parts = urlsplit(link.strip())
+    query = "&".join(p for p in parts.query.split("&") if p and not TRACKING_PARAMS.match(p.split("=")[0]))
+    host = parts.netloc.lower().removeprefix("www.")
+    return urlunsplit(("", host, parts.path.rstrip("/"), query, "")).lstrip("/") or None
+
+def posting_key(row):
+    """Employer + title + location, normalized; catches the same posting under different links."""
+    return "|".join(normalize_text(row.get(column) or "") for column in ("Company", "Title", "Location"))
+
+def query_key(career, location):
+    return f"{normalize_text(career)}|{normalize_text(location)}"
+
+def match_expression(column, text):
+    """An FTS5 query requiring every word of text, as a prefix, in column (None if text has no words)."""
+    words = TOKEN.findall(text.lower())
+    if not words:
+        return None
+    return f"{column} : (" + " AND ".join(f'"{word}"*' for word in words) + ")"
+
+
+class JobIndex:
+    """SQLite FTS5 index of postings, shared by every session (and worker) through one file."""
+
+    def __init__(self, path=JOBS_DB_NAME, job_ttl=JOB_TTL, query_ttl=QUERY_TTL):
+        self.path = path
+        self.job_ttl = job_ttl
+        self.query_ttl = query_ttl
+        self._pool = ConnectionPool(path)
+        self._lock = threading.Lock()
+        self._ingests_since_expire = 0
+        self._init_schema()
+
+    def _init_schema(self):
+        with self._pool.connection() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY,
+                    link_key TEXT,
+                    posting_key TEXT NOT NULL,
+                    title TEXT, company TEXT, location TEXT, link TEXT,
+                    first_seen REAL NOT NULL,
+                    last_seen REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_jobs_link_key ON jobs (link_key);
+                CREATE INDEX IF NOT EXISTS idx_jobs_posting_key ON jobs (posting_key);
+                CREATE INDEX IF NOT EXISTS idx_jobs_last_seen ON jobs (last_seen);
+
+                CREATE VIRTUAL TABLE IF NOT EXISTS jobs_fts USING fts5(
+                    title, company, location, content='jobs', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+                );
+                CREATE TRIGGER IF NOT EXISTS jobs_ai AFTER INSERT ON jobs BEGIN
+                    INSERT INTO jobs_fts (rowid, title, company, location) VALUES (new.id, new.title, new.company, new.location);
+                END;
+                CREATE TRIGGER IF NOT EXISTS jobs_ad AFTER DELETE ON jobs BEGIN
+                    INSERT INTO jobs_fts (jobs_fts, rowid, title, company, location) VALUES ('delete', old.id, old.title, old.company, old.location);
+                END;
+                CREATE TRIGGER IF NOT EXISTS jobs_au AFTER UPDATE OF title, company, location ON jobs BEGIN
+                    INSERT INTO jobs_fts (jobs_fts, rowid, title, company, location) VALUES ('delete', old.id, old.title, old.company, old.location);
+                    INSERT INTO jobs_fts (rowid, title, company, location) VALUES (new.id, new.title, new.company, new.location);
+                END;
+
+                -- Which API searches have been fetched, and the postings each returned (in order)
+                CREATE TABLE IF NOT EXISTS job_queries (
+                    query_key TEXT PRIMARY KEY,
+                    location_key TEXT NOT NULL,
+                    pages INTEGER NOT NULL,
+                    exhausted INTEGER NOT NULL,
+                    fetched_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS job_query_hits (
+                    query_key TEXT NOT NULL,
+                    job_id INTEGER NOT NULL,
+                    rank INTEGER NOT NULL,
+                    PRIMARY KEY (query_key, job_id)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS idx_job_query_hits_job ON job_query_hits (job_id);
+            """)
+
+    # --- Ingest ---
+    @metrics.timed("jobs.index_ingest")
+    def ingest(self, career, location, page, rows, exhausted=False):
+        """Upserts one fetched page of job rows (JOB_COLUMNS dicts) and records it for the search."""
+        now = time.time()
+        key = query_key(career, location)
+        with self._pool.transaction() as conn:
+            if page == 1:
+                conn.execute("DELETE FROM job_query_hits WHERE query_key = ?", (key,))
+            for position, row in enumerate(rows):
+                job_id = self._upsert(conn, row, now)
+                conn.execute(
+                    "INSERT OR IGNORE INTO job_query_hits (query_key, job_id, rank) VALUES (?, ?, ?)",
+                    (key, job_id, (page - 1) * 100 + position),
+                )
+            conn.execute("""
+                INSERT INTO job_queries (query_key, location_key, pages, exhausted, fetched_at) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(query_key) DO UPDATE SET
+                    pages = MAX(CASE WHEN excluded.pages = 1 THEN 0 ELSE pages END, excluded.pages),
+                    exhausted = excluded.exhausted,
+                    fetched_at = CASE WHEN excluded.pages = 1 THEN excluded.fetched_at ELSE fetched_at END
+            """, (key, normalize_text(location), page, int(exhausted), now))
+        with self._lock:
+            self._ingests_since_expire += 1
+            due = self._ingests_since_expire >= EXPIRE_EVERY
+            if due:
+                self._ingests_since_expire = 0
+        if due:
+            self.expire()
+
+    def _upsert(self, conn, row, now):
+        link, posting = link_key(row.get("Link")), posting_key(row)
+        existing = None
+        if link:
+            existing = conn.execute("SELECT id FROM jobs WHERE link_key = ?", (link,)).fetchone()
+        if existing is None:
+            existing = conn.execute("SELECT id FROM jobs WHERE posting_key = ?", (posting,)).fetchone()
+        values = (link, posting, row.get("Title"), row.get("Company"), row.get("Location"), row.get("Link"), now)
+        if existing is not None:
+            conn.execute("""
+                UPDATE jobs SET link_key = COALESCE(?, link_key), posting_key = ?, title = ?, company = ?, location = ?,
+                                link = COALESCE(?, link), last_seen = ?
+                WHERE id = ?
+            """, values + existing)
+            return existing[0]
+        return conn.execute("""
+            INSERT INTO jobs (link_key, posting_key, title, company, location, link, first_seen, last_seen)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, values + (now,)).lastrowid
+
+    def expire(self):
+        """Drops postings not seen for job_ttl and searches older than query_ttl."""
+        now = time.time()
+        with self._pool.transaction() as conn:
+            conn.execute("DELETE FROM job_queries WHERE fetched_at <= ?", (now - self.query_ttl,))
+            conn.execute("DELETE FROM job_query_hits WHERE query_key NOT IN (SELECT query_key FROM job_queries)")
+            conn.execute("DELETE FROM job_query_hits WHERE job_id IN (SELECT id FROM jobs WHERE last_seen <= ?)", (now - self.job_ttl,))
+            conn.execute("DELETE FROM jobs WHERE last_seen <= ?", (now - self.job_ttl,))
+
+    # --- Search ---
+    def query_state(self, career, location):
+        """(pages fetched, exhausted) if this search was fetched from the API within query_ttl, else None."""
+        with self._pool.connection() as conn:
+            row = conn.execute(
+                "SELECT pages, exhausted FROM job_queries WHERE query_key = ? AND fetched_at > ?",
+                (query_key(career, location), time.time() - self.query_ttl),
+            ).fetchone()
+        return None if row is None else (row[0], bool(row[1]))
+
+    def _base(self, career, location, max_age=None):
+        """SQL and params selecting the postings for a search: what the API returned for it
+        within query_ttl, plus any indexed posting whose title matches career and whose
+        location matches. max_age (seconds since last seen) defaults to job_ttl."""
+        now = time.time()
+        key = query_key(career, location)
+        clauses = ["""j.id IN (SELECT h.job_id FROM job_query_hits h JOIN job_queries q USING (query_key)
+                              WHERE h.query_key = ? AND q.fetched_at > ?)"""]
+        params = [key, now - self.query_ttl]
+        title_match = match_expression("title", career)
+        if title_match:
+            local = "j.id IN (SELECT rowid FROM jobs_fts WHERE jobs_fts MATCH ?)"
+            local_params = [title_match]
+            location_match = match_expression("location", location)
+            if location_match:
+                # A location like "USA" rarely appears in "Austin, TX", so also accept postings
+                # that an earlier search for the same location returned
+                local += """ AND (j.id IN (SELECT rowid FROM jobs_fts WHERE jobs_fts MATCH ?)
+                              OR j.id IN (SELECT h.job_id FROM job_query_hits h JOIN job_queries q USING (query_key)
+                                          WHERE q.location_key = ?))"""
+                local_params += [location_match, normalize_text(location)]
+            clauses.append(f"({local})")
+            params += local_params
+        where = f"j.last_seen > ? AND ({' OR '.join(clauses)})"
+        return where, [now - (self.job_ttl if max_age is None else max_age)] + params, key
+
+    @metrics.timed("jobs.index_search")
+    def search(self, career, location, companies=(), locations=(), text="", limit=MAX_RESULTS):
+        """Job rows (JOB_COLUMNS dicts) for a search, narrowed by company/location facets and free text."""
+        where, params, key = self._base(career, location)
+        if companies:
+            where += f" AND j.company IN ({', '.join('?' * len(companies))})"
+            params += list(companies)
+        if locations:
+            where += f" AND j.location IN ({', '.join('?' * len(locations))})"
+            params += list(locations)
+        text_match = match_expression("{title company location}", text)
+        if text_match:
+            where += " AND j.id IN (SELECT rowid FROM jobs_fts WHERE jobs_fts MATCH ?)"
+            params.append(text_match)
+        with self._pool.connection() as conn:
+            rows = conn.execute(f"""
+                SELECT j.title, j.company, j.location, j.link
+                FROM jobs j LEFT JOIN job_query_hits h ON h.job_id = j.id AND h.query_key = ?
+                WHERE {where}
+                ORDER BY h.rank IS NULL, h.rank, j.last_seen DESC
+                LIMIT ?
+            """, [key] + params + [limit]).fetchall()
+        return [{"Title": t, "Company": c, "Location": l, "Link": link} for t, c, l, link in rows]
+
+    def count(self, career, location, max_age=None):
+        """Postings for a search; with max_age, only those seen within that many seconds."""
+        where, params, _ = self._base(career, location, max_age)
+        with self._pool.connection() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM jobs j WHERE {where}", params).fetchone()[0]
+
+    @metrics.timed("jobs.index_facets")
+    def facets(self, career, location, limit=50):
+        """{"company": [(value, count)], "location": [(value, count)]} over a search's postings."""
+        where, params, _ = self._base(career, location)
+        result = {}
+        with self._pool.connection() as conn:
+            for column in ("company", "location"):
+                result[column] = conn.execute(f"""
+                    SELECT j.{column}, COUNT(*) FROM jobs j
+                    WHERE {where} AND COALESCE(j.{column}, '') != ''
+                    GROUP BY j.{column} ORDER BY COUNT(*) DESC, j.{column} LIMIT ?
+                """, params + [limit]).fetchall()
+        return result
+
+    def stats(self):
+        with self._pool.connection() as conn:
+            (jobs,) = conn.execute("SELECT COUNT(*) FROM jobs").fetchone()
+            (queries,) = conn.execute("SELECT COUNT(*) FROM job_queries").fetchone()
+        return {"jobs": jobs, "queries": queries}
@@ -0,0 +1,191 @@
+# ======================================================================================
+# JSEARCH CLIENT - pooled, retrying, cached access to the RapidAPI job search
+# ======================================================================================
+
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import metrics
+from llm_cache import normalize_text
+from rate_limit import DEFAULT_PENALTY, RateLimitExceeded, retry_after_seconds
+from singleflight import SingleFlight
+
+JSEARCH_HOST = "jsearch.p.rapidapi.com"
+JSEARCH_URL = f"https://{JSEARCH_HOST}"
+JOB_COLUMNS = ["Title", "Company", "Location", "Link"]
+PAGE_SIZE = 10  # JSearch returns up to 10 postings per page
+CACHE_TTL = 15 * 60
+MAX_CACHE_ENTRIES = 512
+
+
+def job_row(job):
+    """Flattens one JSearch posting into the columns shown on the Jobs page."""
+    return {
+        "Title": job.get("job_title"),
+        "Company": job.get("employer_name"),
+        "Location": f"{job.get('job_city') or ''}, {job.get('job_state') or ''}".strip(", "),
+        "Link": job.get("job_apply_link"),
+    }
+
+
+class JSearchClient:
+    """Keep-alive session with retry/backoff on 5xx, a TTL cache per (career, location, page)
+    and single-flight coalescing of identical concurrent searches.
+
+    A 429 is never retried or waited out here: its Retry-After can be an hour, and urllib3
+    would sleep through it on the script thread (and every coalesced waiter with it). It is
+    passed to the limiter instead.
+
+    With a limiter (see rate_limit), requests take a token first. When over budget, or when
+    the API answers 429, an expired cached page is served instead if one is still held;
+    otherwise RateLimitExceeded is raised.
+    """
+
+    def __init__(self, api_key, base_url=JSEARCH_URL, timeout=20, cache_ttl=CACHE_TTL,
+                 max_cache_entries=MAX_CACHE_ENTRIES, max_retries=3, backoff_factor=0.5, pool_size=10,
+                 limiter=None):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.cache_ttl = cache_ttl
+        self.max_cache_entries = max_cache_entries
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._flights = SingleFlight()
+        self.limiter = limiter
+        self.hits = 0
+        self.misses = 0
+        self.stale_served = 0
+
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(500, 502, 503, 504),
+            allowed_methods=frozenset(["GET"]),
+            respect_retry_after_header=False,  # Backoff only, so a 5xx Retry-After cannot stall the thread either
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"X-RapidAPI-Key": api_key, "X-RapidAPI-Host": JSEARCH_HOST})
+
+    @staticmethod
+    def cache_key(career, location, page):
+        return (normalize_text(career), normalize_text(location), page)
+
+    def search_page(self, career, location, page=1):
+        """Returns one page of job rows, from the cache when a fresh copy exists."""
+        key = self.cache_key(career, location, page)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and entry[0] > now:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                metrics.cache_event("jobs", True)
+                return entry[1]
+            self.misses += 1
+        metrics.cache_event("jobs", False)
+        # Identical searches already on the wire are joined rather than repeated
+        return self._flights.do(key, self._fetch, key, career, location, page)
+
+    def _fetch(self, key, career, location, page):
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                return entry[1]  # Filled by a flight that finished since the lookup
+
+        if self.limiter is not None:
+            try:
+                self.limiter.acquire()
+            except RateLimitExceeded as e:
+                return self._stale_or_raise(entry, e)
+
+        query = f"{career} in {location}" if location else career
+        with metrics.timed("jobs.search"):
+            response = self.session.get(
+                f"{self.base_url}/search",
+                params={"query": query, "page": str(page), "num_pages": "1"},
+                timeout=self.timeout,
+            )
+            if self.limiter is not None:
+                self._report(response)
+            if response.status_code == 429:
+                wait = retry_after_seconds(response.headers.get("Retry-After"))
+                error = RateLimitExceeded(self.limiter.name if self.limiter is not None else "jsearch",
+                                          DEFAULT_PENALTY if wait is None else wait)
+                return self._stale_or_raise(entry, error)
+            response.raise_for_status()
+        rows = [job_row(job) for job in response.json().get("data") or []]
+
+        with self._lock:
+            self._cache[key] = (time.monotonic() + self.cache_ttl, rows)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_cache_entries:
+                self._cache.popitem(last=False)
+        return rows
+
+    def _stale_or_raise(self, entry, error):
+        """Graceful degradation, as in llm_cache: the expired page for this key if one is still held."""
+        if entry is None:
+            raise error
+        with self._lock:
+            self.stale_served += 1
+        return entry[1]
+
+    def _report(self, response):
+        """Feeds a 429 and its Retry-After back to the limiter; successes let its rate recover."""
+        if response.status_code == 429:
+            self.limiter.penalize(retry_after_seconds(response.headers.get("Retry-After")))
+        elif response.ok:
+            self.limiter.reward()
+
+    @property
+    def coalesced(self):
+        """Searches answered by joining an identical request already in flight."""
+        return self._flights.coalesced
+
+    def pager(self, career, location, index=None):
+        return JobPager(self, career, location, index)
+
+    def close(self):
+        self.session.close()
+
+
+class JobPager:
+    """Lazily walks the result pages of one search; earlier pages are never refetched.
+
+    With a JobIndex, every fetched page is ingested into it, and a search fetched recently
+    (by any session) resumes after the pages already in the index.
+    """
+
+    def __init__(self, client, career, location, index=None):
+        self.client = client
+        self.career = career
+        self.location = location
+        self.index = index
+        self.rows = []
+        self.pages_loaded = 0
+        self.exhausted = False
+        state = index.query_state(career, location) if index is not None else None
+        if state is not None:
+            self.pages_loaded, self.exhausted = state
+
+    def load_more(self):
+        """Fetches the next page and returns its rows ([] once the results run out)."""
+        if self.exhausted:
+            return []
+        rows = self.client.search_page(self.career, self.location, self.pages_loaded + 1)
+        self.pages_loaded += 1
+        if len(rows) < PAGE_SIZE:
+            self.exhausted = True
+        self.rows.extend(rows)
+        if self.index is not None:
+            self.index.ingest(self.career, self.location, self.pages_loaded, rows, self.exhausted)
+        return rows
@@ -0,0 +1,384 @@
+# ======================================================================================
+# LLM RESPONSE CACHE - persistent, cross-process store for Gemini generations
+# ======================================================================================
+# Every Streamlit worker (and every restart) shares one SQLite file, so a roadmap for
+# "Data Scientist" is generated once and served to everyone until its TTL expires.
+
+import functools
+import hashlib
+import json
+import re
+import threading
+import time
+
+import metrics
+from db import ConnectionPool
+from rate_limit import RateLimitExceeded
+from singleflight import SingleFlight
+
+CACHE_DB_NAME = "llm_cache.db"  # Lives next to users_v5.db
+MAX_ENTRIES = 5000
+DEFAULT_TTL = 3600
+
+# Per-function time-to-live, in seconds
+TTLS = {
+    "fields": 6 * 3600,
+    "guidance": 24 * 3600,
+    "roadmap": 7 * 24 * 3600,
+    "roadmap_structure": 7 * 24 * 3600,
+}
+
+# Spellings of the same career that should share one cache entry
+FIELD_SYNONYMS = {
+    "ds": "data scientist",
+    "data science": "data scientist",
+    "data analysis": "data analyst",
+    "ml engineer": "machine learning engineer",
+    "ml engineering": "machine learning engineer",
+    "machine learning engineering": "machine learning engineer",
+    "ai engineer": "artificial intelligence engineer",
+    "swe": "software engineer",
+    "software developer": "software engineer",
+    "software development": "software engineer",
+    "software engineering": "software engineer",
+    "web dev": "web developer",
+    "web development": "web developer",
+    "ux designer": "ux/ui designer",
+    "ui/ux designer": "ux/ui designer",
+    "ui ux designer": "ux/ui designer",
+    "cyber security": "cybersecurity analyst",
+    "cybersecurity": "cybersecurity analyst",
+}
+
+MISS = object()  # Sentinel so cached falsy values are still hits
+STATS_FLUSH_INTERVAL = 5.0  # Seconds between hit/miss counter flushes
+TOUCH_INTERVAL = 60.0  # LRU timestamps are only refreshed this often per entry
+STALE_GRACE = 7 * 24 * 3600  # Expired entries are kept this long as a fallback when upstream is over budget
+
+
+# --- Key normalization ---
+def normalize_text(text):
+    """Lowercases, collapses whitespace and trims punctuation so trivial edits share a key."""
+    text = re.sub(r"\s+", " ", str(text or "")).strip().lower()
+    return text.strip(" .,;:!?\"'`")
+
+def normalize_field(field):
+    """Normalizes a career field name and maps known synonyms to one canonical spelling."""
+    field = normalize_text(field)
+    field = re.sub(r"^(an?|the)\s+", "", field)
+    return FIELD_SYNONYMS.get(field, field)
+
+def make_key(namespace, key_args):
+    payload = json.dumps([namespace, key_args], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ResponseCache:
+    """SQLite-backed key/value cache with per-namespace TTLs and size-bounded LRU eviction."""
+
+    def __init__(self, path=CACHE_DB_NAME, max_entries=MAX_ENTRIES, ttls=None):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttls = dict(TTLS, **(ttls or {}))
+        self._pool = ConnectionPool(path)
+        self._lock = threading.Lock()
+        self._pending_stats = {}
+        self._pending_hits = {}  # key -> hits served since the last flush
+        self._last_stats_flush = time.monotonic()
+        self._writes_since_evict = 0
+        self.stale_served = 0
+        self._init_schema()
+
+    def _init_schema(self):
+        with self._pool.transaction() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    namespace TEXT NOT NULL,
+                    args TEXT,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_access ON llm_cache (last_access)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS llm_cache_stats (
+                    namespace TEXT PRIMARY KEY,
+                    hits INTEGER NOT NULL DEFAULT 0,
+                    misses INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+
+    def ttl_for(self, namespace):
+        return self.ttls.get(namespace, DEFAULT_TTL)
+
+    def get(self, namespace, key, count=True, allow_stale=False):
+        """Returns the cached value, or MISS if absent or expired (unless allow_stale).
+
+        count=False skips the hit/miss counters, including the entry's own hit count.
+        """
+        now = time.time()
+        with self._pool.connection() as conn:
+            row = conn.execute("SELECT value, expires_at, last_access FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is not None and now - row[2] >= TOUCH_INTERVAL and (row[1] > now or allow_stale):
+                conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+        if row is None or (row[1] <= now and not allow_stale):
+            if count:
+                self._count(namespace, hit=False)
+            return MISS
+        if count:
+            self._count(namespace, hit=True, key=key)
+        return json.loads(row[0])
+
+    def set(self, namespace, key, value, ttl=None, args=None):
+        now = time.time()
+        ttl = self.ttl_for(namespace) if ttl is None else ttl
+        with self._pool.connection() as conn:
+            conn.execute(
+                """
+                INSERT INTO llm_cache (key, namespace, args, value, created_at, expires_at, last_access)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    value = excluded.value, args = excluded.args, created_at = excluded.created_at,
+                    expires_at = excluded.expires_at, last_access = excluded.last_access
+                """,
+                (key, namespace, json.dumps(args, ensure_ascii=False), json.dumps(value, ensure_ascii=False),
+                 now, now + ttl, now),
+            )
+        with self._lock:
+            self._writes_since_evict += 1
+            due = self._writes_since_evict >= max(1, self.max_entries // 100)
+            if due:
+                self._writes_since_evict = 0
+        if due:
+            self.evict()
+
+    def evict(self):
+        """Drops entries past their stale grace period, then the least recently used ones beyond max_entries."""
+        with self._pool.transaction() as conn:
+            conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (time.time() - STALE_GRACE,))
+            (count,) = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+            if count > self.max_entries:
+                conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY last_access LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+
+    def expires_in(self, key):
+        """Seconds until key expires (negative once stale), or None if it is not stored."""
+        with self._pool.connection() as conn:
+            row = conn.execute("SELECT expires_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+        return None if row is None else row[0] - time.time()
+
+    def usage(self, namespace):
+        """Yields (args, value, hits) for every entry in namespace, most used first."""
+        self.flush_stats()
+        with self._pool.connection() as conn:
+            rows = conn.execute(
+                "SELECT args, value, hits FROM llm_cache WHERE namespace = ? ORDER BY hits DESC, last_access DESC",
+                (namespace,),
+            ).fetchall()
+        for args, value, hits in rows:
+            yield json.loads(args) if args else None, json.loads(value), hits
+
+    def clear(self):
+        with self._pool.transaction() as conn:
+            conn.execute("DELETE FROM llm_cache")
+            conn.execute("DELETE FROM llm_cache_stats")
+        with self._lock:
+            self._pending_stats.clear()
+            self._pending_hits.clear()
+
+    # --- Hit/miss counters, buffered in memory and shared through the stats table ---
+    # Per-entry hits (the usage log warmup.py ranks by) are buffered the same way
+    def _count(self, namespace, hit, key=None):
+        metrics.cache_event(namespace, hit)
+        with self._lock:
+            hits, misses = self._pending_stats.get(namespace, (0, 0))
+            self._pending_stats[namespace] = (hits + hit, misses + (not hit))
+            if key is not None:
+                self._pending_hits[key] = self._pending_hits.get(key, 0) + 1
+            due = time.monotonic() - self._last_stats_flush >= STATS_FLUSH_INTERVAL
+        if due:
+            self.flush_stats()
+
+    def flush_stats(self):
+        with self._lock:
+            pending, self._pending_stats = self._pending_stats, {}
+            pending_hits, self._pending_hits = self._pending_hits, {}
+            self._last_stats_flush = time.monotonic()
+        if not pending:
+            return
+        with self._pool.transaction() as conn:
+            conn.executemany("UPDATE llm_cache SET hits = hits + ? WHERE key = ?",
+                             [(hits, key) for key, hits in pending_hits.items()])
+            conn.executemany(
+                """
+                INSERT INTO llm_cache_stats (namespace, hits, misses) VALUES (?, ?, ?)
+                ON CONFLICT(namespace) DO UPDATE SET hits = hits + excluded.hits, misses = misses + excluded.misses
+                """,
+                [(ns, hits, misses) for ns, (hits, misses) in pending.items()],
+            )
+
+    def stats(self):
+        """Returns {namespace: {"hits", "misses", "entries"}} across all processes sharing the file."""
+        self.flush_stats()
+        result = {}
+        with self._pool.connection() as conn:
+            for ns, hits, misses in conn.execute("SELECT namespace, hits, misses FROM llm_cache_stats"):
+                result[ns] = {"hits": hits, "misses": misses, "entries": 0}
+            for ns, entries in conn.execute("SELECT namespace, COUNT(*) FROM llm_cache GROUP BY namespace"):
+                result.setdefault(ns, {"hits": 0, "misses": 0, "entries": 0})["entries"] = entries
+        return result
+
+
+# --- Process-wide shared instance ---
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_response_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache()
+    return _cache
+
+def configure(path=CACHE_DB_NAME, **kwargs):
+    """Replaces the shared cache, e.g. to point the warm-up job or a benchmark at another file."""
+    global _cache
+    with _cache_lock:
+        _cache = ResponseCache(path, **kwargs)
+    return _cache
+
+def _is_cacheable(value):
+    return value is not None and value != [] and value != ""
+
+# Concurrent misses for the same key within this process share one upstream call
+flights = SingleFlight()
+
+def _stale_or_raise(cache, namespace, key, error):
+    """Graceful degradation: an over-budget upstream is answered with an expired entry if one exists."""
+    value = cache.get(namespace, key, count=False, allow_stale=True)
+    if value is MISS:
+        raise error
+    cache.stale_served += 1
+    return value
+
+class StreamAbandoned(Exception):
+    """The streaming leader of a flight stopped early; waiters should retry on their own."""
+
+def cached(namespace, key_fn, cache_if=_is_cacheable, negative_ttl=None):
+    """Decorator: serves calls from the shared cache, keyed on key_fn(*args) under namespace.
+
+    Results rejected by cache_if (empty answers) are returned but not stored, unless
+    negative_ttl is set, in which case they are kept for only that many seconds.
+    Concurrent misses for one key are coalesced into a single call of func; an exception
+    is raised to every waiter and never cached.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args):
+            cache = get_response_cache()
+            key_args = key_fn(*args)
+            key = make_key(namespace, key_args)
+            value = cache.get(namespace, key)
+            if value is not MISS:
+                return value
+
+            def compute():
+                # A flight that just finished may have filled the entry since our lookup
+                value = cache.get(namespace, key, count=False)
+                if value is not MISS:
+                    return value
+                try:
+                    value = func(*args)
+                except RateLimitExceeded as e:
+                    return _stale_or_raise(cache, namespace, key, e)
+                if cache_if(value):
+                    cache.set(namespace, key, value, args=list(args))
+                elif negative_ttl:
+                    cache.set(namespace, key, value, ttl=negative_ttl, args=list(args))
+                return value
+
+            while True:
+                try:
+                    return flights.do(key, compute)
+                except StreamAbandoned:
+                    continue
+        wrapper.cache_key = lambda *args: make_key(namespace, key_fn(*args))
+        wrapper.namespace = namespace
+        wrapper.cache_if = cache_if
+        return wrapper
+    return decorator
+
+def peek(cached_func, *args, count=True):
+    """Returns what cached_func(*args) would be served from the cache, or MISS, without calling it.
+
+    Pass count=False for a probe whose value is not shown to a user, so it does not count as a hit.
+    """
+    return get_response_cache().get(cached_func.namespace, cached_func.cache_key(*args), count=count)
+
+def store(cached_func, args, value):
+    """Fills cached_func's entry for args with a value computed elsewhere."""
+    get_response_cache().set(cached_func.namespace, cached_func.cache_key(*args), value, args=list(args))
+
+def stream_through_cache(cached_func, args, make_chunks):
+    """Yields a cached_func result chunk by chunk, filling its cache entry once the stream completes.
+
+    On a hit the whole cached value is yielded at once; make_chunks() is only called on a
+    miss. Callers arriving while the same result is already being generated (streamed or
+    not) wait for it and receive it whole.
+    """
+    cache = get_response_cache()
+    namespace = cached_func.namespace
+    key = cached_func.cache_key(*args)
+    value = cache.get(namespace, key)
+    if value is not MISS:
+        yield value
+        return
+    while True:
+        call, leader = flights.begin(key)
+        if leader:
+            break
+        try:
+            yield flights.wait(call)
+            return
+        except StreamAbandoned:
+            continue
+
+    value = cache.get(namespace, key, count=False)
+    if value is not MISS:
+        flights.finish(key, call, result=value)
+        yield value
+        return
+    parts = []
+    try:
+        for chunk in make_chunks():
+            parts.append(chunk)
+            yield chunk
+    except RateLimitExceeded as e:
+        if parts:
+            flights.finish(key, call, error=e)
+            raise
+        try:
+            value = _stale_or_raise(cache, namespace, key, e)
+        except RateLimitExceeded:
+            flights.finish(key, call, error=e)
+            raise
+        flights.finish(key, call, result=value)
+        yield value
+        return
+    except GeneratorExit:
+        flights.finish(key, call, error=StreamAbandoned())
+        raise
+    except BaseException as e:
+        flights.finish(key, call, error=e)
+        raise
+    value = "".join(parts)
+    if cached_func.cache_if(value):
+        cache.set(namespace, key, value, args=list(args))
+    flights.finish(key, call, result=value)
@@ -0,0 +1,180 @@
+# ======================================================================================
+# LLM PROVIDERS - one reusable model client per process, real or fake
+# ======================================================================================
+# mentor_ai talks to whatever provider is registered here. GeminiProvider configures the
+# SDK and builds its GenerativeModel once, on first use; FakeProvider is a deterministic,
+# offline stand-in with configurable latency and streaming for load tests and demos.
+# Set MENTOR_LLM_PROVIDER=fake to run the whole app without network access.
+
+import hashlib
+import os
+import re
+import threading
+import time
+
+from rate_limit import DEFAULT_PENALTY, RateLimitExceeded, get_limiter, is_rate_limited
+
+GEMINI_MODEL = "gemini-1.5-flash"
+PROVIDER_ENV = "MENTOR_LLM_PROVIDER"
+
+
+class GeminiProvider:
+    name = "gemini"
+
+    def __init__(self, api_key, model_name=GEMINI_MODEL):
+        self._api_key = api_key  # A string, or a zero-argument callable resolved on first use
+        self.model_name = model_name
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _get_model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    import google.generativeai as genai
+                    api_key = self._api_key() if callable(self._api_key) else self._api_key
+                    genai.configure(api_key=api_key)
+                    self._model = genai.GenerativeModel(self.model_name)
+        return self._model
+
+    def generate(self, prompt, response_schema=None):
+        if response_schema is None:
+            return self._get_model().generate_content(prompt).text
+        generation_config = {"response_mime_type": "application/json", "response_schema": response_schema}
+        return self._get_model().generate_content(prompt, generation_config=generation_config).text
+
+    def stream(self, prompt):
+        for chunk in self._get_model().generate_content(prompt, stream=True):
+            text = chunk.text
+            if text:
+                yield text
+
+
+class FakeProvider:
+    """Deterministic offline provider: same prompt, same answer, after a configurable delay."""
+
+    name = "fake"
+    FIELD_POOL = [
+        "Data Scientist", "Machine Learning Engineer", "UX/UI Designer", "Software Engineer",
+        "Product Manager", "Cybersecurity Analyst", "Game Developer", "Data Analyst",
+        "Cloud Architect", "Technical Writer", "Bioinformatics Scientist", "Robotics Engineer",
+    ]
+
+    def __init__(self, latency=0.0, chunk_delay=0.0, chunk_size=64):
+        self.latency = latency  # Seconds before the first byte
+        self.chunk_delay = chunk_delay  # Seconds between streamed chunks
+        self.chunk_size = chunk_size
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _respond(self, prompt):
+        with self._lock:
+            self.calls += 1
+        seed = int(hashlib.sha256(prompt.encode()).hexdigest(), 16)
+        quoted = re.findall(r"'([^']+)'", prompt) + ["your field", "your field"]
+        subject = quoted[1] if prompt.startswith("You are 'Mentor'") else quoted[0]
+        if "JSON array" in prompt:
+            picks = [self.FIELD_POOL[(seed >> (8 * i)) % len(self.FIELD_POOL)] for i in range(8)]
+            return "[" + ", ".join(f'"{field}"' for field in dict.fromkeys(picks)) + "]"
+        if "career roadmap" in prompt:
+            phases = []
+            for number, (emoji, title) in enumerate([("🎓", "Foundations"), ("🛠️", "Building Skills"), ("🚀", "Real Projects"), ("💼", "Landing the Job")], 1):
+                phases.append(
+                    f"### {emoji} Phase {number}: {title}\n"
+                    f"- **Timeline:** {3 * number}-{3 * number + 3} Months\n"
+                    f"- **Key Skills to Acquire:**\n  - {subject} fundamentals {number}\n  - Communication\n"
+                    f"- **Recommended Projects:**\n  1. A {subject} portfolio piece #{number}\n"
+                    f"- **Networking & Growth:**\n  - Join a {subject} community\n"
+                )
+            return f"Here is your roadmap to becoming a {subject}!\n\n" + "\n".join(phases)
+        return (
+            f"## 🚀 Why Your Interests Are a Perfect Match\nYour interests line up well with **{subject}**.\n\n"
+            f"## 🗺️ Your 6-Month Kickstart Roadmap\n1. Learn the basics\n2. Build a project\n3. Share it\n\n"
+            f"## 🌟 A Word of Encouragement\nYou've got this!\n"
+        )
+
+    def generate(self, prompt, response_schema=None):
+        time.sleep(self.latency)
+        return self._respond(prompt)
+
+    def stream(self, prompt):
+        time.sleep(self.latency)
+        text = self._respond(prompt)
+        for start in range(0, len(text), self.chunk_size):
+            if start:
+                time.sleep(self.chunk_delay)
+            yield text[start:start + self.chunk_size]
+
+
+class RateLimitedProvider:
+    """Wraps a provider with a token bucket that queues calls and adapts to 429 responses."""
+
+    def __init__(self, provider, limiter):
+        self.provider = provider
+        self.limiter = limiter
+        self.name = provider.name
+
+    def _check_rate_limited(self, error):
+        """A 429 pauses the bucket and surfaces as RateLimitExceeded, so callers fall back to stale answers."""
+        if is_rate_limited(error):
+            self.limiter.penalize()
+            raise RateLimitExceeded(self.limiter.name, DEFAULT_PENALTY) from error
+
+    def _guarded(self, fn, *args, **kwargs):
+        self.limiter.acquire()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            self._check_rate_limited(e)
+            raise
+        self.limiter.reward()
+        return result
+
+    def generate(self, prompt, response_schema=None):
+        return self._guarded(self.provider.generate, prompt, response_schema=response_schema)
+
+    def stream(self, prompt):
+        self.limiter.acquire()
+        try:
+            yield from self.provider.stream(prompt)
+        except Exception as e:
+            self._check_rate_limited(e)
+            raise
+        self.limiter.reward()
+
+
+def create_provider(kind=None, api_key=None, rate_limited=None, **kwargs):
+    """Builds a provider by name ("gemini" or "fake"), defaulting to $MENTOR_LLM_PROVIDER.
+
+    Gemini goes through the shared "gemini" rate limiter unless rate_limited=False.
+    """
+    kind = (kind or os.environ.get(PROVIDER_ENV) or "gemini").lower()
+    if kind == "fake":
+        kwargs.setdefault("latency", float(os.environ.get("MENTOR_FAKE_LATENCY", 0)))
+        kwargs.setdefault("chunk_delay", float(os.environ.get("MENTOR_FAKE_CHUNK_DELAY", 0)))
+        provider = FakeProvider(**kwargs)
+    elif kind == "gemini":
+        provider = GeminiProvider(api_key or (lambda: os.environ["GEMINI_API_KEY"]), **kwargs)
+    else:
+        raise ValueError(f"Unknown LLM provider: {kind}")
+    if rate_limited if rate_limited is not None else kind == "gemini":
+        provider = RateLimitedProvider(provider, get_limiter("gemini"))
+    return provider
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+def set_provider(provider):
+    global _provider
+    with _provider_lock:
+        _provider = provider
+    return provider
+
+def get_provider():
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                _provider = create_provider()
+    return _provider
@@ -0,0 +1,202 @@
+# ======================================================================================
+# MENTOR AI - prompts and Gemini generations, independent of the Streamlit UI
+# ======================================================================================
+# Functions here raise on failure instead of calling st.error, so they can run from
+# background threads and be exercised against the offline FakeProvider. Results go
+# through the shared response cache in llm_cache.py.
+
+import ast
+import json
+import re
+
+from llm_cache import MISS, cached, normalize_text, normalize_field, peek, store, stream_through_cache
+from llm_providers import get_provider
+from metrics import timed, timed_iter
+from roadmap import Roadmap, parse_roadmap
+
+FIELD_COUNT = 4
+FIELDS_NEGATIVE_TTL = 60  # An unparseable suggestion list is only remembered briefly
+
+# --- Prompts ---
+def fields_prompt(interest_text):
+    return f"""Based on the user's interest in '{interest_text}', suggest {FIELD_COUNT} specific and diverse career fields. Return the answer ONLY as a JSON array of strings."""
+
+def guidance_prompt(interests, field):
+    return f"""You are 'Mentor', an expert career AI. Generate an inspiring and detailed career guide for a student interested in '{field}', with interests in '{interests}'. Use markdown and emojis. Include these sections: 🚀 Why Your Interests Are a Perfect Match, 🗺️ Your 6-Month Kickstart Roadmap, 🌟 A Word of Encouragement."""
+
+def roadmap_prompt(field):
+    return f"""
+        Create a detailed, step-by-step career roadmap for a '{field}'. The tone must be encouraging, professional, and clear for a student. Format the output using markdown. Use emojis for each phase title.
+        **CRITICAL:** Structure the response into exactly 4 phases, each with a title like this: '### 🎓 Phase 1: Title'.
+        Inside each phase, include these EXACT subheadings with bolding:
+        - **Timeline:** (e.g., 6-12 Months)
+        - **Key Skills to Acquire:** (A short bulleted list of essential technical and soft skills)
+        - **Recommended Projects:** (A numbered list of 1-2 project ideas to build a portfolio)
+        - **Networking & Growth:** (A short bulleted list of tips, like joining communities or finding a mentor)
+        """
+
+
+# --- Model calls (through the process-wide provider in llm_providers.py) ---
+@timed("llm.generate")
+def generate_text(prompt, response_schema=None):
+    """Blocking generation; response_schema switches to structured JSON output."""
+    return get_provider().generate(prompt, response_schema=response_schema)
+
+def stream_text(prompt):
+    """Yields text chunks as the model produces them."""
+    return timed_iter("llm.stream", get_provider().stream(prompt))
+
+
+# --- Field suggestions ---
+# Structured output should return a clean JSON array, but the parser still repairs the
+# usual formatting slips (code fences, prose around the list, single or curly quotes,
+# trailing commas, bullet lists) without ever evaluating model output as code.
+CODE_FENCE = re.compile(r'^\s*```[a-zA-Z]*\s*|\s*```\s*$')
+LIST_LINE = re.compile(r'^\s*(?:[-*+\u2022]|\d+[.)])\s+(.+?)\s*$', re.MULTILINE)
+QUOTE_REPAIRS = str.maketrans({"\u201c": '"', "\u201d": '"', "\u2018": "'", "\u2019": "'"})
+
+def _bracketed_spans(text):
+    """Yields every balanced [...] span in order of its opening bracket, honouring brackets inside quoted strings."""
+    start = text.find("[")
+    while start != -1:
+        depth, quote, escaped = 0, None, False
+        for i in range(start, len(text)):
+            ch = text[i]
+            if quote:
+                if escaped: escaped = False
+                elif ch == "\\": escaped = True
+                elif ch == quote: quote = None
+            elif ch in "\"'":
+                quote = ch
+            elif ch == "[":
+                depth += 1
+            elif ch == "]":
+                depth -= 1
+                if depth == 0:
+                    yield text[start:i + 1]
+                    break
+        start = text.find("[", start + 1)
+
+def _load_list(candidate):
+    candidate = re.sub(r',\s*([\]}])', r'\1', candidate)  # Trailing commas
+    try:
+        return json.loads(candidate)
+    except ValueError:
+        pass
+    try:
+        return ast.literal_eval(candidate)  # Literals only: single-quoted Python lists
+    except (ValueError, SyntaxError):
+        return None
+
+def _flatten(value):
+    if isinstance(value, dict):  # {"fields": [...]} and similar wrappers
+        value = next((v for v in value.values() if isinstance(v, list)), [])
+    if not isinstance(value, (list, tuple)):
+        return []
+    items = []
+    for item in value:
+        if isinstance(item, (list, tuple)):
+            items.extend(_flatten(item))
+        elif isinstance(item, dict):  # [{"name": "..."}]
+            items.extend([v for v in item.values() if isinstance(v, str)][:1])
+        elif isinstance(item, str):
+            items.append(item)
+    return items
+
+def _split_unquoted(spans):
+    """Unquoted names ("[Data Scientist, Web Developer]"): the first span listing several, else the first non-empty one."""
+    best = []
+    for span in spans:
+        items = [item.strip(" \t\n\"'") for item in span[1:-1].split(",")]
+        items = [item for item in items if item]
+        if len(items) > 1:
+            return items
+        best = best or items
+    return best
+
+def parse_field_list(text):
+    """Extracts a list of career names from model output; returns [] if none can be found."""
+    text = CODE_FENCE.sub("", (text or "").translate(QUOTE_REPAIRS)).strip()
+    value = _load_list(text)
+    if value is not None:
+        return _flatten(value)
+    # Prose may contain brackets of its own ("Sure! [see below]"): use the first span that holds names
+    spans = list(_bracketed_spans(text))
+    for bracketed in spans:
+        fields = _flatten(_load_list(bracketed))
+        if fields:
+            return fields
+    items = [item.strip('"\'') for item in LIST_LINE.findall(text)]
+    if items:
+        return items
+    return _split_unquoted(spans)
+
+def normalize_fields(fields, limit=FIELD_COUNT):
+    """Cleans up field names and drops duplicates (including synonyms), keeping the first spelling."""
+    seen, result = set(), []
+    for field in fields:
+        field = re.sub(r'\*\*|__|`', '', str(field))
+        field = re.sub(r'\s+', ' ', field).strip(" .,;:-\"'")
+        key = normalize_field(field)
+        if not key or key in seen:
+            continue
+        seen.add(key)
+        result.append(field)
+    return result[:limit]
+
+
+# --- Cached generations ---
+@cached("fields", lambda interest_text: [normalize_text(interest_text)], negative_ttl=FIELDS_NEGATIVE_TTL)
+def generate_fields(interest_text):
+    """Suggested career fields, or [] when the answer could not be parsed (cached briefly)."""
+    response_text = generate_text(fields_prompt(interest_text), response_schema=list[str])
+    return normalize_fields(parse_field_list(response_text))
+
+@cached("guidance", lambda interests, field: [normalize_text(interests), normalize_field(field)])
+def generate_guidance(interests, field):
+    return generate_text(guidance_prompt(interests, field))
+
+@cached("roadmap", lambda field: [normalize_field(field)])
+def generate_roadmap(field):
+    return generate_text(roadmap_prompt(field))
+
+def _has_phases(data):
+    return bool(data and data.get("phases"))
+
+# The parsed roadmap is cached next to its text, so reruns never re-parse markdown. A
+# roadmap with no recognizable phases is returned but not cached, so it is shown as raw
+# markdown and parsed again later rather than remembered as an empty card.
+@cached("roadmap_structure", lambda field: [normalize_field(field)], cache_if=_has_phases)
+def generate_roadmap_structure(field):
+    return parse_roadmap(generate_roadmap(field)).to_dict()
+
+def cached_roadmap_structure(field):
+    """Returns the cached Roadmap for field, or None if it has not been generated yet."""
+    data = peek(generate_roadmap_structure, field)
+    return Roadmap.from_dict(data) if data is not MISS and _has_phases(data) else None
+
+def cached_guidance(interests, field):
+    """Returns the cached guidance for (interests, field), or None if it has not been generated yet."""
+    text = peek(generate_guidance, interests, field, count=False)
+    return None if text is MISS else text
+
+def cached_roadmap(field):
+    """Returns the cached roadmap text for field, or None if no complete roadmap has been generated."""
+    text = peek(generate_roadmap, field, count=False)
+    return None if text is MISS else text
+
+def remember_roadmap_structure(field, roadmap_text):
+    """Parses a roadmap produced outside generate_roadmap_structure (e.g. streamed) and caches it."""
+    structure = parse_roadmap(roadmap_text)
+    data = structure.to_dict()
+    if generate_roadmap_structure.cache_if(data):
+        store(generate_roadmap_structure, (field,), data)
+    return structure
+
+def stream_guidance(interests, field):
+    """Streaming twin of generate_guidance; a cache hit arrives as a single chunk."""
+    return stream_through_cache(generate_guidance, (interests, field), lambda: stream_text(guidance_prompt(interests, field)))
+
+def stream_roadmap(field):
+    """Streaming twin of generate_roadmap; a cache hit arrives as a single chunk."""
+    return stream_through_cache(generate_roadmap, (field,), lambda: stream_text(roadmap_prompt(field)))
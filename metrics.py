@@ -0,0 +1,211 @@
+# ======================================================================================
+# METRICS - in-process latency histograms, counters and cache hit ratios
+# ======================================================================================
+# Hot paths are wrapped with timed("name"), as a decorator or a context manager. Each name
+# keeps cumulative histogram buckets (for Prometheus) and a window of recent samples
+# (for the percentiles on the admin dashboard). Only exceptions count as errors; control
+# flow such as GeneratorExit or Streamlit's rerun is timed but not counted as a failure.
+#
+# Export: set MENTOR_METRICS_PORT to serve /metrics over HTTP, or MENTOR_METRICS_FILE
+# to rewrite a Prometheus text file (for node_exporter's textfile collector).
+
+import functools
+import logging
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "mentor"
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+WINDOW = 1024  # Recent samples kept per name for percentiles
+METRICS_PORT_ENV = "MENTOR_METRICS_PORT"
+METRICS_FILE_ENV = "MENTOR_METRICS_FILE"
+FILE_INTERVAL = 15.0
+
+
+class _Series:
+    def __init__(self):
+        self.buckets = [0] * len(BUCKETS)
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.recent = deque(maxlen=WINDOW)
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}
+        self._caches = {}  # name -> [hits, misses]
+
+    def observe(self, name, seconds, error=False):
+        with self._lock:
+            series = self._series.get(name)
+            if series is None:
+                series = self._series[name] = _Series()
+            series.count += 1
+            series.errors += error
+            series.total += seconds
+            series.recent.append(seconds)
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    series.buckets[i] += 1
+
+    def cache_event(self, name, hit):
+        with self._lock:
+            counts = self._caches.setdefault(name, [0, 0])
+            counts[0 if hit else 1] += 1
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+            self._caches.clear()
+
+    def snapshot(self):
+        """Returns (timings, caches) as lists of dicts, for the admin dashboard."""
+        with self._lock:
+            series = {name: (s.count, s.errors, s.total, sorted(s.recent)) for name, s in self._series.items()}
+            caches = {name: tuple(counts) for name, counts in self._caches.items()}
+        timings = []
+        for name, (count, errors, total, recent) in sorted(series.items()):
+            timings.append({
+                "name": name, "count": count, "errors": errors,
+                "error_rate": errors / count if count else 0.0,
+                "mean": total / count if count else 0.0,
+                "p50": _percentile(recent, 50), "p95": _percentile(recent, 95), "p99": _percentile(recent, 99),
+            })
+        cache_rows = []
+        for name, (hits, misses) in sorted(caches.items()):
+            cache_rows.append({"name": name, "hits": hits, "misses": misses,
+                               "hit_ratio": hits / (hits + misses) if hits + misses else 0.0})
+        return timings, cache_rows
+
+    def render_prometheus(self):
+        """The Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            series = {name: (list(s.buckets), s.count, s.errors, s.total) for name, s in self._series.items()}
+            caches = {name: tuple(counts) for name, counts in self._caches.items()}
+        lines = [
+            f"# HELP {PREFIX}_duration_seconds Latency of instrumented operations.",
+            f"# TYPE {PREFIX}_duration_seconds histogram",
+        ]
+        for name, (buckets, count, _, total) in sorted(series.items()):
+            label = f'name="{_escape(name)}"'
+            for bound, cumulative in zip(BUCKETS, buckets):
+                lines.append(f'{PREFIX}_duration_seconds_bucket{{{label},le="{bound}"}} {cumulative}')
+            lines.append(f'{PREFIX}_duration_seconds_bucket{{{label},le="+Inf"}} {count}')
+            lines.append(f"{PREFIX}_duration_seconds_sum{{{label}}} {total:.6f}")
+            lines.append(f"{PREFIX}_duration_seconds_count{{{label}}} {count}")
+        lines += [f"# HELP {PREFIX}_errors_total Instrumented operations that raised.", f"# TYPE {PREFIX}_errors_total counter"]
+        for name, (_, _, errors, _) in sorted(series.items()):
+            lines.append(f'{PREFIX}_errors_total{{name="{_escape(name)}"}} {errors}')
+        lines += [f"# HELP {PREFIX}_cache_requests_total Cache lookups by result.", f"# TYPE {PREFIX}_cache_requests_total counter"]
+        for name, (hits, misses) in sorted(caches.items()):
+            lines.append(f'{PREFIX}_cache_requests_total{{cache="{_escape(name)}",result="hit"}} {hits}')
+            lines.append(f'{PREFIX}_cache_requests_total{{cache="{_escape(name)}",result="miss"}} {misses}')
+        return "\n".join(lines) + "\n"
+
+
+def _percentile(ordered, pct):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))]
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registry = Registry()
+observe = registry.observe
+cache_event = registry.cache_event
+snapshot = registry.snapshot
+render_prometheus = registry.render_prometheus
+
+
+class timed:
+    """Times a block (with timed("db.query"): ...) or every call of a function (@timed("db.query"))."""
+
+    def __init__(self, name):
+        self.name = name
+        self._starts = threading.local()
+
+    def __enter__(self):
+        self._starts.__dict__.setdefault("stack", []).append(time.perf_counter())
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        start = self._starts.stack.pop()
+        observe(self.name, time.perf_counter() - start, error=exc_type is not None and issubclass(exc_type, Exception))
+        return False
+
+    def __call__(self, fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with self:
+                return fn(*args, **kwargs)
+        return wrapper
+
+def timed_iter(name, chunks):
+    """Passes an iterator through, timing it from first pull to exhaustion (streamed responses)."""
+    with timed(name):
+        yield from chunks
+
+
+# --- Export ---
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def start_http_server(port, host="127.0.0.1"):
+    """Serves /metrics on a daemon thread. Returns the server, or None if the port is taken."""
+    try:
+        server = ThreadingHTTPServer((host, port), _Handler)
+    except OSError as e:
+        logger.warning("Metrics endpoint not started on port %s: %s", port, e)
+        return None
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+def write_prometheus(path):
+    """Atomically rewrites path with the current metrics."""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(render_prometheus())
+    os.replace(tmp, path)
+
+def start_file_writer(path, interval=FILE_INTERVAL):
+    def loop():
+        while True:
+            time.sleep(interval)
+            try:
+                write_prometheus(path)
+            except OSError:
+                logger.warning("Could not write metrics to %s", path, exc_info=True)
+    threading.Thread(target=loop, name="metrics-file", daemon=True).start()
+
+def start_exporters():
+    """Starts whichever exporters the environment asks for; returns a short description of them."""
+    started = []
+    port = os.environ.get(METRICS_PORT_ENV)
+    if port and start_http_server(int(port)):
+        started.append(f"http://127.0.0.1:{port}/metrics")
+    path = os.environ.get(METRICS_FILE_ENV)
+    if path:
+        start_file_writer(path)
+        started.append(path)
+    return started
@@ -0,0 +1,137 @@
+# ======================================================================================
+# PASSWORDS - salted scrypt hashing, bounded KDF executor, short-lived verification cache
+# ======================================================================================
+# Stored format: "scrypt$<log2 n>$<r>$<p>$<salt hex>$<hash hex>". Rows written before this
+# module existed hold a bare unsalted SHA-256 hex digest; they still verify and are
+# rehashed with the current cost on the next successful login (see db.check_user).
+# Raise the cost with MENTOR_SCRYPT_LOG_N; older hashes are upgraded the same way.
+
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+SCRYPT_LOG_N = int(os.environ.get("MENTOR_SCRYPT_LOG_N", 14))  # 2**14 * r=8 -> 16 MiB and ~50 ms per hash
+SCRYPT_R = 8
+SCRYPT_P = 1
+SALT_BYTES = 16
+KEY_BYTES = 32
+
+KDF_WORKERS = 2  # Concurrent hashes; each one holds 128 * r * n bytes of memory
+KDF_MAX_PENDING = 32  # Hashes queued or running before new logins are turned away
+KDF_QUEUE_TIMEOUT = 5.0
+VERIFIED_TTL = 300  # Seconds a successful (email, password) check is remembered
+VERIFIED_MAX_ENTRIES = 10000
+
+
+class KDFBusy(Exception):
+    def __init__(self):
+        super().__init__("Too many sign-ins are being processed right now. Please try again in a few seconds.")
+
+
+# --- Hashing ---
+def _scrypt(password, salt, log_n, r, p):
+    n = 1 << log_n
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, dklen=KEY_BYTES,
+                          maxmem=128 * r * (n + p + 2) + (1 << 20))
+
+def _legacy_hash(password):
+    return hashlib.sha256(password.encode()).hexdigest()
+
+def hash_password(password, log_n=None):
+    """Returns a new salted scrypt hash string for password."""
+    log_n = SCRYPT_LOG_N if log_n is None else log_n
+    salt = secrets.token_bytes(SALT_BYTES)
+    digest = _scrypt(password, salt, log_n, SCRYPT_R, SCRYPT_P)
+    return f"scrypt${log_n}${SCRYPT_R}${SCRYPT_P}${salt.hex()}${digest.hex()}"
+
+def verify_password(password, stored, log_n=None):
+    """Returns (matches, needs_rehash) for password against a stored hash of either format."""
+    log_n = SCRYPT_LOG_N if log_n is None else log_n
+    if not stored.startswith("scrypt$"):
+        return hmac.compare_digest(_legacy_hash(password), stored), True
+    try:
+        _, stored_log_n, r, p, salt, digest = stored.split("$")
+        stored_log_n, r, p = int(stored_log_n), int(r), int(p)
+        salt, digest = bytes.fromhex(salt), bytes.fromhex(digest)
+    except ValueError:
+        return False, False
+    matches = hmac.compare_digest(_scrypt(password, salt, stored_log_n, r, p), digest)
+    return matches, (stored_log_n, r, p) != (log_n, SCRYPT_R, SCRYPT_P)
+
+# Unknown emails are checked against this, so they cost as much as a wrong password
+_DUMMY_HASH = None
+
+def dummy_hash():
+    global _DUMMY_HASH
+    if _DUMMY_HASH is None:
+        _DUMMY_HASH = hash_password(secrets.token_hex(8))
+    return _DUMMY_HASH
+
+
+# --- Bounded executor ---
+# KDF work runs on its own small pool so a login flood queues here (and is turned away
+# past KDF_MAX_PENDING) instead of tying up every Streamlit script thread in scrypt.
+_executor = ThreadPoolExecutor(max_workers=KDF_WORKERS, thread_name_prefix="kdf")
+_slots = threading.BoundedSemaphore(KDF_MAX_PENDING)
+
+def run_kdf(fn, *args, timeout=KDF_QUEUE_TIMEOUT):
+    """Runs fn(*args) on the KDF pool and waits for it; raises KDFBusy if the pool is saturated."""
+    if not _slots.acquire(timeout=timeout):
+        raise KDFBusy()
+    try:
+        future = _executor.submit(fn, *args)
+    except BaseException:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+    return future.result()
+
+
+# --- Verification cache ---
+class VerifiedCache:
+    """Remembers recent successful logins so repeat clicks skip the KDF.
+
+    Entries are keyed by an HMAC of (email, password) under a per-process random key and
+    are only honoured while the user's stored hash is unchanged, so a password change
+    invalidates them immediately. Nothing here outlives the process.
+    """
+
+    def __init__(self, ttl=VERIFIED_TTL, max_entries=VERIFIED_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._key = secrets.token_bytes(32)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+
+    def _token(self, email, password):
+        return hmac.new(self._key, f"{email}\0{password}".encode(), hashlib.sha256).digest()
+
+    def check(self, email, password, stored):
+        token = self._token(email, password)
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None or entry[0] <= time.monotonic() or entry[1] != stored:
+                return False
+            self.hits += 1
+            return True
+
+    def remember(self, email, password, stored):
+        token = self._token(email, password)
+        with self._lock:
+            self._entries[token] = (time.monotonic() + self.ttl, stored)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+
+verified = VerifiedCache()
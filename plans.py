@@ -0,0 +1,140 @@
+# ======================================================================================
+# PLANS - each user's saved mentor plans, and reuse of plans for near-duplicate interests
+# ======================================================================================
+# A plan is one run of the mentor: the interests text, the suggested fields, and the
+# guidance and parsed roadmap for the field the user chose. Plans live in users_v5.db
+# (see db.save_plan), so a returning user picks up where they left off.
+#
+# Interests are compared as token sets. An exact match on the normalized text reuses the
+# user's own plan; otherwise the plan_tokens index yields candidates sharing the most
+# tokens and the best one is reused if its Jaccard similarity reaches
+# SIMILARITY_THRESHOLD. Editing one word of a long description thus costs no LLM call.
+
+import hashlib
+import json
+import re
+from dataclasses import dataclass
+
+import db
+import mentor_ai
+from llm_cache import normalize_field, normalize_text
+from roadmap import Roadmap
+
+SIMILARITY_THRESHOLD = 0.75
+CANDIDATES = 20  # Plans sharing the most tokens that are scored exactly
+
+STOPWORDS = frozenset("""
+    a about also am an and any are as at be been but by can do doing for from get have i i'm im
+    in into is it its just like love lot lots me more much my of on or really so some such than
+    that the their them then there these thing things this to too very want was we what when
+    which who will with would you your enjoy enjoying interested interest interests
+""".split())
+TOKEN = re.compile(r"[a-z0-9+#]+")
+
+
+def interest_tokens(text):
+    """The sorted set of meaningful words in an interests text, with plural 's' stripped."""
+    tokens = set()
+    for word in TOKEN.findall(normalize_text(text)):
+        if word in STOPWORDS or len(word) < 2:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+            word = word[:-1]
+        tokens.add(word)
+    return sorted(tokens)
+
+def interests_hash(text):
+    return hashlib.sha256(" ".join(interest_tokens(text)).encode()).hexdigest()
+
+def content_hash(value):
+    text = value if isinstance(value, str) else json.dumps(value, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+@dataclass(frozen=True)
+class Plan:
+    id: int
+    user_email: str
+    interests: str
+    fields: list
+    chosen_field: str = None
+    guidance: str = None
+    roadmap: dict = None
+    updated_at: str = None
+    similarity: float = 1.0
+
+    @classmethod
+    def from_row(cls, row, similarity=1.0):
+        plan_id, user_email, interests, fields, chosen_field, guidance, roadmap, updated_at = row
+        return cls(plan_id, user_email, interests, json.loads(fields), chosen_field, guidance,
+                   json.loads(roadmap) if roadmap else None, updated_at, similarity)
+
+    def guidance_for(self, field):
+        """The saved guidance if it was generated for field, else None."""
+        if self.guidance and normalize_field(self.chosen_field or "") == normalize_field(field):
+            return self.guidance
+        return None
+
+    def roadmap_for(self, field):
+        """The saved Roadmap if it was generated for field, else None."""
+        if self.roadmap and normalize_field(self.chosen_field or "") == normalize_field(field):
+            return Roadmap.from_dict(self.roadmap)
+        return None
+
+
+# --- Lookups ---
+def latest_plan(user_email):
+    row = db.get_latest_plan(user_email)
+    return None if row is None else Plan.from_row(row)
+
+def get_plan(plan_id):
+    row = db.get_plan(plan_id)
+    return None if row is None else Plan.from_row(row)
+
+def find_plan(user_email, interests, threshold=SIMILARITY_THRESHOLD):
+    """The best saved plan for these interests: the user's exact match, else the most similar
+    plan of any user at or above threshold (the user's own plans win ties). None if nothing is close."""
+    row = db.find_plan_by_hash(user_email, interests_hash(interests))
+    if row is not None:
+        return Plan.from_row(row)
+    tokens = interest_tokens(interests)
+    best = None
+    for plan_id, shared, token_count in db.find_similar_plans(tokens, CANDIDATES):
+        similarity = shared / (len(tokens) + token_count - shared)
+        if similarity < threshold:
+            continue
+        plan = Plan.from_row(db.get_plan(plan_id), similarity)
+        if best is None or (similarity, plan.user_email == user_email) > (best.similarity, best.user_email == user_email):
+            best = plan
+    return best
+
+
+# --- Creating and updating ---
+def suggest_fields(user_email, interests):
+    """Returns (plan, reused): a saved plan for near-identical interests, or a new one with fresh fields.
+
+    From another user's plan only the suggested fields are reused. They are saved as a new
+    plan under this user's own interests text, and the other user's description, choice,
+    guidance and roadmap stay theirs. Guidance is regenerated for this user and roadmaps
+    come from the shared response cache.
+    """
+    plan = find_plan(user_email, interests)
+    if plan is not None:
+        if plan.user_email != user_email:
+            plan_id = db.save_plan(user_email, interests, interests_hash(interests), interest_tokens(interests), json.dumps(plan.fields))
+            plan = get_plan(plan_id)
+        return plan, True
+    fields = mentor_ai.generate_fields(interests)
+    if not fields:
+        return None, False
+    plan_id = db.save_plan(user_email, interests, interests_hash(interests), interest_tokens(interests), json.dumps(fields))
+    return get_plan(plan_id), False
+
+def save_guidance(plan_id, field, guidance):
+    if guidance:
+        db.update_plan(plan_id, field, "guidance", guidance, content_hash(guidance))
+
+def save_roadmap(plan_id, field, structure):
+    if structure is not None and structure.phases:
+        data = structure.to_dict()
+        db.update_plan(plan_id, field, "roadmap", json.dumps(data, ensure_ascii=False), content_hash(data))
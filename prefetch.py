@@ -0,0 +1,138 @@
+# ======================================================================================
+# PREFETCH ENGINE - speculative generation of guidance and roadmaps
+# ======================================================================================
+# Once the mentor suggests fields, the guidance and roadmap for every one of them is
+# generated in the background so that picking a field (or opening the Roadmap page)
+# is served straight from the response cache.
+
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import llm_providers
+import mentor_ai
+
+logger = logging.getLogger(__name__)
+
+MAX_WORKERS = 4  # Global cap on concurrent speculative LLM calls in this process
+PER_USER_LIMIT = 2  # One user's prefetch can never occupy more than this many workers
+RESERVED_TOKENS = 3  # Speculative calls are skipped unless the LLM rate budget has this much headroom
+
+
+class _UserQueue:
+    def __init__(self, user):
+        self.user = user
+        self.pending = deque()
+        self.running = 0
+        self.cancelled = False
+
+
+class PrefetchEngine:
+    """Runs speculative jobs on a bounded thread pool with per-user limits and cancellation."""
+
+    def __init__(self, max_workers=MAX_WORKERS, per_user_limit=PER_USER_LIMIT):
+        self.per_user_limit = per_user_limit
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        self._lock = threading.Lock()
+        self._users = {}
+        self._wanted = {}  # Key of each queued or running job -> users who asked for it, so it is never scheduled twice
+
+    def submit(self, user, key, fn, *args):
+        """Queues fn(*args) for user unless an identical job (same key) is already scheduled."""
+        with self._lock:
+            wanted = self._wanted.get(key)
+            if wanted is not None:
+                wanted.add(user)
+                return False
+            self._wanted[key] = {user}
+            self._enqueue(user, (key, fn, args))
+        return True
+
+    def prefetch_plans(self, user, interests, fields):
+        """Schedules guidance for every suggested field, then their roadmaps (text and parsed structure)."""
+        for field in fields:
+            self.submit(user, mentor_ai.generate_guidance.cache_key(interests, field), mentor_ai.generate_guidance, interests, field)
+        for field in fields:
+            self.submit(user, mentor_ai.generate_roadmap_structure.cache_key(field), mentor_ai.generate_roadmap_structure, field)
+
+    def cancel(self, user):
+        """Drops the user's queued jobs. Calls already in flight finish and still fill the cache.
+
+        A queued job that another user also asked for is handed over to that user's queue
+        instead. Returns the number of jobs dropped.
+        """
+        with self._lock:
+            for wanted in self._wanted.values():
+                wanted.discard(user)
+            queue = self._users.pop(user, None)
+            if queue is None:
+                return 0
+            queue.cancelled = True
+            dropped = 0
+            for job in queue.pending:
+                wanted = self._wanted[job[0]]
+                if wanted:
+                    self._enqueue(min(wanted), job)
+                else:
+                    del self._wanted[job[0]]
+                    dropped += 1
+            queue.pending.clear()
+        return dropped
+
+    def pending_count(self, user):
+        with self._lock:
+            queue = self._users.get(user)
+            return 0 if queue is None else len(queue.pending) + queue.running
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            for queue in self._users.values():
+                queue.cancelled = True
+                queue.pending.clear()
+            self._users.clear()
+            self._wanted.clear()
+        self._executor.shutdown(wait=wait)
+
+    @staticmethod
+    def _admit():
+        """Admission control: speculative work never eats into the budget interactive users need."""
+        limiter = getattr(llm_providers.get_provider(), "limiter", None)
+        return limiter is None or limiter.available() >= RESERVED_TOKENS
+
+    def _enqueue(self, user, job):
+        # Caller holds self._lock
+        queue = self._users.get(user)
+        if queue is None or queue.cancelled:
+            queue = self._users[user] = _UserQueue(user)
+        queue.pending.append(job)
+        self._dispatch(queue)
+
+    def _dispatch(self, queue):
+        # Caller holds self._lock
+        while queue.pending and queue.running < self.per_user_limit:
+            job = queue.pending.popleft()
+            queue.running += 1
+            self._executor.submit(self._run, queue, job)
+
+    def _run(self, queue, job):
+        key, fn, args = job
+        skipped = queue.cancelled
+        try:
+            if not skipped and self._admit():
+                fn(*args)
+        except Exception:
+            logger.warning("Prefetch of %s failed", getattr(fn, "__name__", fn), exc_info=True)
+        finally:
+            with self._lock:
+                queue.running -= 1
+                wanted = self._wanted.get(key)
+                if skipped and wanted:
+                    # Cancelled after it was handed to the pool but before it started: another user still wants it
+                    self._enqueue(min(wanted), job)
+                else:
+                    self._wanted.pop(key, None)
+                if not queue.cancelled:
+                    self._dispatch(queue)
+                if not queue.pending and not queue.running and self._users.get(queue.user) is queue:
+                    del self._users[queue.user]  # Idle; recreated by the user's next submit
@@ -0,0 +1,235 @@
+# ======================================================================================
+# RATE LIMITING - adaptive token buckets for upstream APIs (Gemini, JSearch)
+# ======================================================================================
+# Every upstream call takes a token first. Callers queue for a token until a deadline,
+# then get RateLimitExceeded so the caller can fall back to a stale cached answer
+# instead of spending quota on a request that would only come back as a 429.
+# When a 429 does arrive, the bucket pauses for Retry-After and halves its rate, then
+# creeps back up on every success (AIMD).
+#
+# Buckets are per process by default. Set MENTOR_RATE_LIMIT_DB to a SQLite file to share
+# one budget between all workers on a machine.
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from db import ConnectionPool
+
+RATE_LIMIT_DB_ENV = "MENTOR_RATE_LIMIT_DB"
+DEFAULT_PENALTY = 5.0  # Seconds to pause after a 429 that carries no Retry-After
+RECOVERY_STEP = 0.05  # Fraction of the configured rate regained per successful call
+
+# Requests per second, burst size and the floor adaptation may lower the rate to
+LIMITS = {
+    "gemini": {"rate": 2.0, "burst": 10, "min_rate": 0.2, "queue_timeout": 10.0},
+    "jsearch": {"rate": 1.0, "burst": 5, "min_rate": 0.1, "queue_timeout": 5.0},
+}
+
+
+class RateLimitExceeded(Exception):
+    def __init__(self, name, wait):
+        super().__init__(f"The {name} service is busy right now (over its request budget). Please try again in about {wait:.0f}s.")
+        self.name = name
+        self.wait = wait
+
+
+def is_rate_limited(error):
+    """True for a 429 from either SDK: google.api_core ResourceExhausted or a requests HTTPError."""
+    if getattr(error, "code", None) == 429 or type(error).__name__ in ("ResourceExhausted", "TooManyRequests"):
+        return True
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None) == 429
+
+def retry_after_seconds(value):
+    """Parses a Retry-After header given in seconds; returns None if absent or an HTTP date."""
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Thread-safe token bucket shared by every session in this process."""
+
+    def __init__(self, name, rate, burst, min_rate=None, queue_timeout=10.0):
+        self.name = name
+        self.max_rate = rate
+        self.min_rate = min_rate or rate / 10
+        self.burst = burst
+        self.queue_timeout = queue_timeout
+        self.rejected = 0
+        self.throttled = 0  # 429s reported by the upstream
+        self._lock = threading.Lock()
+        self._state = {"tokens": float(burst), "updated": time.time(), "rate": rate, "paused_until": 0.0}
+
+    # --- Bucket arithmetic on a state dict, shared with SQLiteTokenBucket ---
+    def _take(self, state, now):
+        """Refills state and takes a token if possible; returns seconds to wait (0 = granted)."""
+        state["tokens"] = min(self.burst, state["tokens"] + (now - state["updated"]) * state["rate"])
+        state["updated"] = now
+        if now < state["paused_until"]:
+            return state["paused_until"] - now
+        if state["tokens"] >= 1:
+            state["tokens"] -= 1
+            return 0.0
+        return (1 - state["tokens"]) / state["rate"]
+
+    def _penalize(self, state, now, retry_after):
+        state["rate"] = max(self.min_rate, state["rate"] / 2)
+        state["tokens"] = 0.0
+        state["paused_until"] = max(state["paused_until"], now + (DEFAULT_PENALTY if retry_after is None else retry_after))
+
+    def _available(self, state, now):
+        if now < state["paused_until"]:
+            return 0.0
+        return min(self.burst, state["tokens"] + (now - state["updated"]) * state["rate"])
+
+    def _reward(self, state):
+        state["rate"] = min(self.max_rate, state["rate"] + self.max_rate * RECOVERY_STEP)
+
+    def _update(self, fn):
+        with self._lock:
+            return fn(self._state)
+
+    # --- Public API ---
+    def acquire(self, timeout=None):
+        """Waits for a token; raises RateLimitExceeded if none is available within timeout seconds."""
+        timeout = self.queue_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        while True:
+            wait = self._update(lambda state: self._take(state, time.time()))
+            if wait <= 0:
+                return
+            remaining = deadline - time.monotonic()
+            if wait > remaining:
+                self.rejected += 1
+                raise RateLimitExceeded(self.name, wait)
+            time.sleep(min(wait, 0.25))
+
+    def penalize(self, retry_after=None):
+        """Reports a 429: pause for retry_after seconds and halve the rate."""
+        self.throttled += 1
+        self._update(lambda state: self._penalize(state, time.time(), retry_after))
+
+    def reward(self):
+        """Reports a successful call, letting an adapted rate recover."""
+        self._update(self._reward)
+
+    def available(self):
+        """Tokens that could be taken right now without waiting."""
+        return self._update(lambda state: self._available(state, time.time()))
+
+    @property
+    def rate(self):
+        return self._update(lambda state: state["rate"])
+
+
+class SQLiteTokenBucket(TokenBucket):
+    """A TokenBucket whose state lives in SQLite, so several worker processes share one budget."""
+
+    def __init__(self, path, name, rate, burst, min_rate=None, queue_timeout=10.0):
+        super().__init__(name, rate, burst, min_rate, queue_timeout)
+        self.path = path
+        self._pool = ConnectionPool(path)
+        with self._pool.connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS rate_buckets (
+                    name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL,
+                    rate REAL NOT NULL, paused_until REAL NOT NULL
+                )
+            """)
+            conn.execute("INSERT OR IGNORE INTO rate_buckets VALUES (?, ?, ?, ?, 0)", (name, float(burst), time.time(), rate))
+
+    def _update(self, fn):
+        with self._pool.transaction() as conn:
+            row = conn.execute("SELECT tokens, updated, rate, paused_until FROM rate_buckets WHERE name = ?", (self.name,)).fetchone()
+            state = dict(zip(("tokens", "updated", "rate", "paused_until"), row))
+            result = fn(state)
+            conn.execute(
+                "UPDATE rate_buckets SET tokens = ?, updated = ?, rate = ?, paused_until = ? WHERE name = ?",
+                (state["tokens"], state["updated"], state["rate"], state["paused_until"], self.name),
+            )
+            return result
+
+
+# Login attempts: refill rate per second and burst, per email address and per client IP
+LOGIN_LIMITS = {
+    "email": {"rate": 1 / 30, "burst": 5},
+    "ip": {"rate": 1 / 3, "burst": 20},
+}
+MAX_TRACKED_KEYS = 10000
+
+# Reverse proxies in front of the app that append to X-Forwarded-For. Only the entry the
+# outermost trusted proxy appended is used: everything left of it is sent by the client
+# and could be rotated to get a fresh per-IP bucket on every attempt. Behind a proxy that
+# does not forward the client address, every user shares the proxy's single bucket, so
+# LOGIN_LIMITS["ip"]["burst"] failed attempts from anyone lock everybody out for a while.
+TRUSTED_PROXIES = int(os.environ.get("MENTOR_TRUSTED_PROXIES", 1))
+
+def forwarded_client(forwarded, trusted_proxies=TRUSTED_PROXIES):
+    """The client address from an X-Forwarded-For header, counting trusted_proxies hops from the right."""
+    hops = [hop.strip() for hop in (forwarded or "").split(",") if hop.strip()]
+    if not hops or trusted_proxies < 1:
+        return None
+    return hops[-min(trusted_proxies, len(hops))]
+
+
+class KeyedLimiter:
+    """One small token bucket per key (an email, an IP), for throttling attempts rather than queueing them."""
+
+    def __init__(self, name, rate, burst, max_keys=MAX_TRACKED_KEYS):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self.rejected = 0
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _bucket(self, key):
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(f"{self.name} {key}", self.rate, self.burst, queue_timeout=0)
+                while len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)  # Oldest first; an evicted key starts with a full bucket
+            self._buckets.move_to_end(key)
+            return bucket
+
+    def hit(self, key):
+        """Takes one attempt for key; raises RateLimitExceeded if key is out of attempts."""
+        try:
+            self._bucket(key).acquire(timeout=0)
+        except RateLimitExceeded:
+            self.rejected += 1
+            raise
+
+    def reset(self, key):
+        with self._lock:
+            self._buckets.pop(key, None)
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def get_limiter(name):
+    """The process-wide bucket for an upstream listed in LIMITS."""
+    limiter = _limiters.get(name)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(name)
+            if limiter is None:
+                path = os.environ.get(RATE_LIMIT_DB_ENV)
+                if path:
+                    limiter = SQLiteTokenBucket(path, name, **LIMITS[name])
+                else:
+                    limiter = TokenBucket(name, **LIMITS[name])
+                _limiters[name] = limiter
+    return limiter
+
+def all_limiters():
+    """The upstream buckets created so far in this process, by name."""
+    with _limiters_lock:
+        return dict(_limiters)
@@ -0,0 +1,169 @@
+# ======================================================================================
+# ROADMAP PARSING - generated roadmap markdown -> typed phases
+# ======================================================================================
+# A roadmap is parsed once into a Roadmap of Phases (title, timeline, skills, projects,
+# networking tips, plus the raw markdown for display). The parsed form is cached next
+# to the generated text, so reruns render from it without touching the markdown again.
+
+import functools
+import re
+from dataclasses import dataclass, asdict
+
+PHASE_TITLE = re.compile(r'\bphase\s*(?:\d|[ivx]+\b|one\b|two\b|three\b|four\b|five\b|six\b)', re.IGNORECASE)
+HEADING = re.compile(r'^[ \t]*(#{1,6})[ \t]+(.+?)[ \t]*#*[ \t]*$', re.MULTILINE)
+BOLD_PHASE_HEADING = re.compile(r'^[ \t]*\*\*[ \t]*((?:[^*\n]*\s)?phase\b[^*\n]*?)[ \t]*:?[ \t]*\*\*[ \t]*:?[ \t]*$', re.MULTILINE | re.IGNORECASE)
+
+# "- **Timeline:** 6-12 Months", "**Key Skills to Acquire:**", "Networking & Growth:" ...
+SECTION_LABEL = re.compile(r'^[ \t]*(?:[-*+][ \t]+)?\**[ \t]*([A-Za-z][A-Za-z &/\-]{2,40}?)[ \t]*\**[ \t]*:[ \t]*\**:?[ \t]*(.*)$')
+LIST_ITEM = re.compile(r'^[ \t]*(?:[-*+]|\d+[.)])[ \t]+(.*)$')
+SECTION_KEYWORDS = (
+    ("timeline", ("timeline", "duration", "timeframe")),
+    ("skills", ("skill",)),
+    ("projects", ("project",)),
+    ("networking", ("network", "growth", "communit")),
+)
+
+
+@dataclass(frozen=True)
+class Phase:
+    title: str
+    timeline: str = ""
+    skills: tuple = ()
+    projects: tuple = ()
+    networking: tuple = ()
+    body: str = ""  # The phase's markdown, exactly as generated
+
+
+@dataclass(frozen=True)
+class Roadmap:
+    phases: tuple = ()
+
+    def all_skills(self):
+        """Every skill across all phases, in order, without duplicates."""
+        seen, skills = set(), []
+        for phase in self.phases:
+            for skill in phase.skills:
+                if skill.lower() not in seen:
+                    seen.add(skill.lower())
+                    skills.append(skill)
+        return skills
+
+    def to_dict(self):
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(tuple(
+            Phase(**{key: tuple(value) if isinstance(value, list) else value for key, value in phase.items()})
+            for phase in data.get("phases", ())
+        ))
+
+
+# --- Splitting into phases ---
+def _clean_title(title):
+    return re.sub(r'\*\*|__', '', title).strip().rstrip(':').strip()
+
+def _is_subsection(title):
+    """True for a heading such as "### Timeline" or "### 🛠️ Key Skills" that belongs inside a phase."""
+    return not PHASE_TITLE.search(title) and _section_for(_strip_markup(title).partition(":")[0]) is not None
+
+def _phase_headings(text):
+    """Returns [(start, end, title)] for the lines that open a phase."""
+    headings = [(m.start(), m.end(), len(m.group(1)), m.group(2)) for m in HEADING.finditer(text)]
+    # "Phase 1", "Phase II"... but not a title such as "Your Roadmap in 4 Phases"
+    phase_levels = [level for _, _, level, title in headings if PHASE_TITLE.search(title)]
+    if phase_levels:
+        # Every heading at the level the model used for "Phase N" titles opens a phase
+        level = min(phase_levels)
+    elif any(level == 3 for _, _, level, _ in headings):
+        level = 3
+    else:
+        return [(m.start(), m.end(), m.group(1)) for m in BOLD_PHASE_HEADING.finditer(text)]
+    return [(start, end, title) for start, end, lvl, title in headings if lvl == level and not _is_subsection(title)]
+
+def split_phases(roadmap_content, partial=False):
+    """Splits roadmap markdown into [(phase_title, phase_details), ...]; text before the first heading is dropped.
+
+    Accepts any markdown heading level or a bold "**Phase ...**" line. With partial=True
+    (a stream still in progress) a heading only counts once its line is complete.
+    """
+    complete = roadmap_content[:roadmap_content.rfind("\n") + 1] if partial else roadmap_content
+    headings = _phase_headings(complete)
+    phases = []
+    for i, (_, end, title) in enumerate(headings):
+        stop = headings[i + 1][0] if i + 1 < len(headings) else len(roadmap_content)
+        phases.append((_clean_title(title), roadmap_content[end:stop].lstrip("\n")))
+    return phases
+
+def iter_phases(chunks):
+    """Consumes streamed text chunks and yields (phases, text_so_far) after each one.
+
+    A phase appears as soon as its heading line has fully arrived and its details grow
+    with every following chunk.
+    """
+    text = ""
+    for chunk in chunks:
+        text += chunk
+        yield split_phases(text, partial=True), text
+    if text and not text.endswith("\n"):
+        # A trailing heading with no newline is only final once the stream ends
+        yield split_phases(text), text
+
+
+# --- Structured parsing ---
+def _section_for(label):
+    label = label.lower()
+    for section, keywords in SECTION_KEYWORDS:
+        if any(keyword in label for keyword in keywords):
+            return section
+    return None
+
+def _strip_markup(text):
+    return re.sub(r'\*\*|__|`', '', text).strip()
+
+def parse_phase(title, body):
+    sections = {"timeline": [], "skills": [], "projects": [], "networking": []}
+    current = None
+    for line in body.splitlines():
+        item = LIST_ITEM.match(line)
+        heading = HEADING.match(line)
+        if heading:
+            # Subsections written as headings: "### Timeline", "#### 🛠️ Key Skills: Python, SQL".
+            # Any other heading ends the current section.
+            name, _, rest = _strip_markup(heading.group(2)).partition(":")
+            current = section = _section_for(name)
+            if not section:
+                continue
+        else:
+            label = SECTION_LABEL.match(line)
+            # A bullet is only a section label when bolded ("- **Timeline:**"), so an item such
+            # as "- Project management: ..." stays a skill
+            if label and item and "**" not in line[:label.end(1) + 3]:
+                label = None
+            section = _section_for(label.group(1)) if label else None
+            rest = label.group(2) if section else ""
+        if section:
+            current = section
+            rest = _strip_markup(rest)
+            if rest and current == "skills":
+                sections[current].extend(skill.strip() for skill in rest.split(",") if skill.strip())
+            elif rest:
+                sections[current].append(rest)
+            continue
+        if item and current:
+            sections[current].append(_strip_markup(item.group(1)))
+        elif current == "timeline" and line.strip() and not sections["timeline"]:
+            sections["timeline"].append(_strip_markup(line))
+    return Phase(
+        title=title,
+        timeline=" ".join(sections["timeline"]),
+        skills=tuple(sections["skills"]),
+        projects=tuple(sections["projects"]),
+        networking=tuple(sections["networking"]),
+        body=body,
+    )
+
+@functools.lru_cache(maxsize=128)
+def parse_roadmap(roadmap_content):
+    """Parses generated roadmap markdown into a Roadmap. Memoized per distinct text."""
+    return Roadmap(tuple(parse_phase(title, body) for title, body in split_phases(roadmap_content)))
@@ -0,0 +1,68 @@
+# ======================================================================================
+# SINGLE-FLIGHT - coalesce identical in-flight upstream calls
+# ======================================================================================
+# When many sessions miss the cache for the same key at the same moment, only the first
+# (the leader) calls upstream; the rest wait for it and share its result. Errors reach
+# every waiter but are never remembered: the next call after a failure starts afresh.
+
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.coalesced = 0  # Calls answered by another caller's upstream request
+
+    def begin(self, key):
+        """Joins the flight for key. Returns (call, is_leader); the leader must later call finish()."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.coalesced += 1
+                return call, False
+            call = self._calls[key] = _Call()
+            return call, True
+
+    def finish(self, key, call, result=None, error=None):
+        """Publishes the leader's outcome to all waiters and closes the flight."""
+        call.result, call.error = result, error
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+        call.done.set()
+
+    @staticmethod
+    def wait(call, timeout=None):
+        """Blocks until the leader finishes; returns its result or raises its error."""
+        if not call.done.wait(timeout):
+            raise TimeoutError("Timed out waiting for an identical in-flight request")
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def do(self, key, fn, *args):
+        """Returns fn(*args), sharing one execution among concurrent callers with the same key."""
+        call, leader = self.begin(key)
+        if not leader:
+            return self.wait(call)
+        try:
+            result = fn(*args)
+        except BaseException as e:
+            self.finish(key, call, error=e)
+            raise
+        self.finish(key, call, result=result)
+        return result
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
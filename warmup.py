@@ -0,0 +1,159 @@
+# ======================================================================================
+# WARM-UP - precompute roadmaps and guidance for the most requested career fields
+# ======================================================================================
+# Run before a deploy, or on a schedule shorter than the cache TTLs, so that the first
+# users after a restart (or after an expiry) are served from llm_cache.db instead of
+# waiting on the LLM:
+#
+#   python warmup.py --top 25 --concurrency 4
+#   python warmup.py --seed-file fields.txt --refresh-within 12 --dry-run
+#
+# Popularity comes from the cache itself: every stored roadmap and guidance entry keeps
+# its arguments and a count of the lookups it served, and every cached field suggestion
+# lists the fields users were offered. SEED_FIELDS (and --seed-file) cover a fresh
+# deployment with no history.
+
+import argparse
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import llm_cache
+import llm_providers
+import mentor_ai
+from llm_cache import MISS, normalize_field
+
+SEED_FIELDS = [
+    "Software Engineer", "Data Scientist", "Data Analyst", "Machine Learning Engineer",
+    "UX/UI Designer", "Product Manager", "Cybersecurity Analyst", "Cloud Architect",
+    "Web Developer", "Game Developer", "Digital Marketing Specialist", "Graphic Designer",
+]
+DEFAULT_TOP = 20
+DEFAULT_GUIDANCE_TOP = 50  # (interests, field) pairs; guidance is personal, so only repeats are worth it
+DEFAULT_CONCURRENCY = 4
+
+
+def _api_key():
+    """GEMINI_API_KEY from the environment, else from the app's .streamlit/secrets.toml."""
+    if os.environ.get("GEMINI_API_KEY"):
+        return os.environ["GEMINI_API_KEY"]
+    import tomllib
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".streamlit", "secrets.toml")
+    with open(path, "rb") as f:
+        return tomllib.load(f)["GEMINI_API_KEY"]
+
+
+# --- Picking what to warm ---
+def popular_fields(cache, top, seeds=()):
+    """The top fields by use: roadmap hits, how often a field was suggested, then the seed list."""
+    scores = Counter()
+    names = {}
+    def count(field, weight):
+        key = normalize_field(field)
+        if key:
+            names.setdefault(key, field.strip())
+            scores[key] += weight
+    for namespace in ("roadmap", "roadmap_structure", "guidance"):
+        for args, _, hits in cache.usage(namespace):
+            if args:
+                count(args[-1], 1 + hits)
+    for _, fields, hits in cache.usage("fields"):
+        for field in fields or []:
+            count(field, (1 + hits) / 2)
+    # Seeds rank below anything users actually asked for, in their listed order
+    for rank, field in enumerate(seeds):
+        count(field, 1 / (2 + rank))
+    return [names[key] for key, _ in scores.most_common(top)]
+
+def popular_guidance(cache, top):
+    """The most requested (interests, field) pairs, counting only those served from the guidance cache at least once."""
+    return [tuple(args) for args, _, hits in cache.usage("guidance") if args and len(args) == 2 and hits > 0][:top]
+
+def read_seed_file(path):
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+
+# --- Generating ---
+def _due(cached_func, args, refresh_within):
+    """True if the entry is missing, expired, or expires within refresh_within seconds."""
+    left = llm_cache.get_response_cache().expires_in(cached_func.cache_key(*args))
+    return left is None or left <= refresh_within
+
+def warm(cached_func, args, refresh_within):
+    """Fills one cache entry. Returns "hit", "generated" or "empty"."""
+    if not _due(cached_func, args, refresh_within):
+        return "hit"
+    if llm_cache.peek(cached_func, *args, count=False) is MISS:
+        value = cached_func(*args)
+    else:
+        # Still fresh but about to expire: regenerate ahead of time, bypassing the cache
+        value = cached_func.__wrapped__(*args)
+        if cached_func.cache_if(value):
+            llm_cache.store(cached_func, args, value)
+    return "generated" if cached_func.cache_if(value) else "empty"
+
+def warm_field(field, refresh_within):
+    """Roadmap text first; the parsed structure is then built from the cached text."""
+    results = [warm(mentor_ai.generate_roadmap, (field,), refresh_within)]
+    results.append(warm(mentor_ai.generate_roadmap_structure, (field,), refresh_within))
+    return results
+
+def run(jobs, concurrency):
+    """Runs (label, fn, args) jobs on a bounded pool; returns Counter of outcomes and failures."""
+    outcomes, failures = Counter(), []
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="warmup") as executor:
+        futures = {executor.submit(fn, *args): label for label, fn, args in jobs}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                failures.append((futures[future], e))
+                print(f"  failed   {futures[future]}: {e}")
+                continue
+            for outcome in result if isinstance(result, list) else [result]:
+                outcomes[outcome] += 1
+            print(f"  {'/'.join(result) if isinstance(result, list) else result:<9} {futures[future]}")
+    return outcomes, failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute roadmaps and guidance into the response cache")
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP, help="Number of fields to warm")
+    parser.add_argument("--guidance-top", type=int, default=DEFAULT_GUIDANCE_TOP, help="Number of (interests, field) guidance pairs to refresh")
+    parser.add_argument("--seed-file", help="Extra fields, one per line, ranked after observed usage")
+    parser.add_argument("--no-seeds", action="store_true", help="Ignore the built-in SEED_FIELDS")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Concurrent LLM calls")
+    parser.add_argument("--refresh-within", type=float, default=6, help="Also regenerate entries expiring within this many hours")
+    parser.add_argument("--cache-db", default=llm_cache.CACHE_DB_NAME)
+    parser.add_argument("--dry-run", action="store_true", help="List what would be warmed and exit")
+    args = parser.parse_args(argv)
+
+    cache = llm_cache.configure(args.cache_db)
+    seeds = ([] if args.no_seeds else SEED_FIELDS) + (read_seed_file(args.seed_file) if args.seed_file else [])
+    fields = popular_fields(cache, args.top, seeds)
+    pairs = popular_guidance(cache, args.guidance_top)
+    print(f"Warming {len(fields)} fields and {len(pairs)} guidance pairs into {args.cache_db}")
+    if args.dry_run:
+        for field in fields:
+            print(f"  field    {field}")
+        for interests, field in pairs:
+            print(f"  guidance {field} <- {interests[:60]!r}")
+        return 0
+
+    llm_providers.set_provider(llm_providers.create_provider(api_key=_api_key))
+    refresh_within = args.refresh_within * 3600
+    jobs = [(f"roadmap  {field}", warm_field, (field, refresh_within)) for field in fields]
+    jobs += [(f"guidance {field}", warm, (mentor_ai.generate_guidance, (interests, field), refresh_within)) for interests, field in pairs]
+    start = time.perf_counter()
+    outcomes, failures = run(jobs, args.concurrency)
+    cache.flush_stats()
+    print(f"Done in {time.perf_counter() - start:.1f}s: {outcomes['generated']} generated, "
+          f"{outcomes['hit']} already fresh, {outcomes['empty']} empty, {len(failures)} failed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+# ======================================================================================
+# WRITE-BEHIND QUEUE - batched background writes for ratings and telemetry
+# ======================================================================================
+# The UI hands items to submit() and returns immediately. A worker thread groups them
+# into batches (up to max_batch items, or whatever arrived within max_latency seconds)
+# and passes each batch to flush_fn, which is expected to write it in one transaction.
+# A batch that still fails after every retry is written item by item, and the items that
+# fail even alone are handed to dead_letter_fn (logged by default), so one bad row or a
+# long outage never blocks the items queued behind it.
+
+import atexit
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+MAX_BATCH = 200
+MAX_LATENCY = 0.5  # Seconds an item may wait before its batch is flushed
+MAX_PENDING = 10000
+RETRY_DELAYS = (0.1, 0.5, 1.0, 2.0, 5.0)  # Backoff while flush_fn keeps failing; then the batch is set aside
+
+_STOP = object()
+
+
+class WriteBehindQueue:
+    """Buffers items and flushes them in batches on a background thread.
+
+    A failed batch is retried with backoff, then set aside as described above; close()
+    (registered with atexit) drains everything still queued before the process exits.
+    """
+
+    def __init__(self, flush_fn, max_batch=MAX_BATCH, max_latency=MAX_LATENCY, max_pending=MAX_PENDING, name="write-behind",
+                 retry_delays=RETRY_DELAYS, dead_letter_fn=None):
+        self.flush_fn = flush_fn
+        self.dead_letter_fn = dead_letter_fn
+        self.retry_delays = tuple(retry_delays)
+        self.max_batch = max_batch
+        self.max_latency = max_latency
+        self.name = name
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._closed = False
+        self._close_lock = threading.Lock()
+        self.batches_written = 0
+        self.items_written = 0
+        self.items_failed = 0  # Handed to dead_letter_fn after every retry failed
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, item, timeout=1.0):
+        """Queues one item; blocks up to timeout if the queue is full, then raises queue.Full."""
+        if self._closed:
+            raise RuntimeError(f"{self.name} queue is closed")
+        self._queue.put(item, timeout=timeout)
+
+    def flush(self):
+        """Blocks until every item submitted so far has been written."""
+        self._queue.join()
+
+    def close(self, timeout=30):
+        """Stops accepting items, writes everything still queued and stops the worker."""
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.error("%s: worker did not finish flushing within %ss", self.name, timeout)
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                self._queue.task_done()
+                stopping = True
+                continue
+            batch = [item]
+            deadline = time.monotonic() + self.max_latency
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    self._queue.task_done()
+                    stopping = True  # Write this batch and whatever is left, then exit
+                    break
+                batch.append(item)
+            self._write(batch)
+        self._drain()  # Anything that raced in behind the stop marker
+
+    def _drain(self):
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        for start in range(0, len(batch), self.max_batch):
+            self._write(batch[start:start + self.max_batch])
+
+    def _write(self, batch):
+        for attempt, delay in enumerate(self.retry_delays + (None,)):
+            try:
+                self.flush_fn(batch)
+                self.batches_written += 1
+                self.items_written += len(batch)
+                break
+            except Exception:
+                if delay is None:
+                    logger.exception("%s: flush of %d items failed %d times, writing them one by one", self.name, len(batch), attempt + 1)
+                    self._write_each(batch)
+                    break
+                logger.warning("%s: flush of %d items failed, retrying in %.1fs", self.name, len(batch), delay, exc_info=True)
+                time.sleep(delay)
+        for _ in batch:
+            self._queue.task_done()
+
+    def _write_each(self, batch):
+        """Salvages a batch that keeps failing: writes what it can, dead-letters the rest."""
+        failed = []
+        for item in batch:
+            try:
+                self.flush_fn([item])
+                self.items_written += 1
+            except Exception:
+                failed.append(item)
+        if len(failed) < len(batch):
+            self.batches_written += 1
+        if not failed:
+            return
+        self.items_failed += len(failed)
+        if self.dead_letter_fn is None:
+            logger.error("%s: dropping %d items that could not be written: %r", self.name, len(failed), failed)
+            return
+        try:
+            self.dead_letter_fn(failed)
+        except Exception:
+            logger.exception("%s: dead-letter handler failed; dropping %d items: %r", self.name, len(failed), failed)